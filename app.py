@@ -1,189 +1,167 @@
+import logging
 import os
 import threading
 from flask import Flask, request
 from dotenv import load_dotenv
-import pandas as pd
-from datetime import datetime
-
-from telegram_bot import TelegramBot
-from google_sheets import GoogleSheetsClient
-from converters.task_converter import process_telegram_text, create_canonical_text
-from converters.backlog_converter import BacklogProcessor, convert_mixed_language_date
-
-load_dotenv()
-TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-GOOGLE_SHEET_ID = os.getenv("GOOGLE_SHEET_ID")
-WEBHOOK_URL = os.getenv("WEBHOOK_URL")
-ADMIN_TELEGRAM_ID = os.getenv("ADMIN_TELEGRAM_ID")
-BOT_USERNAME = os.getenv("BOT_USERNAME")
-WORKSHEET_NAME = os.getenv("TARGET_WORKSHEET_NAME", "Backlog")
-
-if not all([TELEGRAM_TOKEN, GEMINI_API_KEY, GOOGLE_SHEET_ID, WEBHOOK_URL, ADMIN_TELEGRAM_ID, BOT_USERNAME, WORKSHEET_NAME]):
-    raise ValueError("Satu atau lebih variabel konfigurasi penting tidak ditemukan di file .env.")
-
-app = Flask(__name__)
-bot = TelegramBot(token=TELEGRAM_TOKEN)
-sheets_client = GoogleSheetsClient(credentials_file='credentials.json', spreadsheet_id=GOOGLE_SHEET_ID)
-backlog_processor = BacklogProcessor(api_keys_string=GEMINI_API_KEY)
-
-def process_message_thread(data):
-    try:
-        message = data['message']
-        text = message.get('text', '')
-        user_id_from_message = str(message['from']['id'])
-
-        if user_id_from_message != ADMIN_TELEGRAM_ID:
-            print(f"Akses ditolak untuk User ID: {user_id_from_message}.")
-            return
-
-        print(f"Akses diberikan untuk admin. Memulai proses update status...")
-
-        # 1. BACA DATA DAN TANGANI KASUS KOSONG
-        existing_df = sheets_client.get_all_data_as_df(worksheet_name=WORKSHEET_NAME)
-        required_cols = ['Epic', 'Backlog', 'PIC', 'Status', 'Start Date', 'End Date']
-
-        if existing_df.empty:
-            print("Worksheet kosong. Menginisialisasi DataFrame kosong.")
-            done_tasks_df = pd.DataFrame(columns=required_cols)
-            inprogress_tasks_df = pd.DataFrame(columns=required_cols)
-        else:
-            for col in required_cols:
-                if col not in existing_df.columns:
-                    raise KeyError(f"Kolom '{col}' tidak ditemukan di Google Sheet.")
-            
-            existing_df['Start Date'] = existing_df['Start Date'].apply(convert_mixed_language_date).pipe(pd.to_datetime, errors='coerce')
-            existing_df['End Date'] = existing_df['End Date'].apply(convert_mixed_language_date).pipe(pd.to_datetime, errors='coerce')
-            existing_df['Canonical Backlog'] = existing_df['Backlog'].apply(create_canonical_text)
-            existing_df.drop_duplicates(subset=['PIC', 'Canonical Backlog'], keep='last', inplace=True)
-
-            done_tasks_df = existing_df[existing_df['Status'] == 'Done'].copy().reset_index(drop=True)
-            inprogress_tasks_df = existing_df[existing_df['Status'] == 'InProgress'].copy().reset_index(drop=True)
-
-        # 2. PROSES INPUT BARU DARI TELEGRAM
-        lines = text.strip().split('\n')
-        raw_text_lines = [line for line in lines if f"@{BOT_USERNAME}" not in line]
-        raw_text = "\n".join(raw_text_lines)
-        
-        intermediate_df = process_telegram_text(raw_text)
-        if intermediate_df.empty:
-            bot.send_message(ADMIN_TELEGRAM_ID, "Proses Gagal: Task Converter tidak menghasilkan data.")
-            return
 
-        if not intermediate_df.empty:
-            intermediate_df.drop_duplicates(subset=['PIC', 'Canonical Backlog'], keep='first', inplace=True)
-
-        # 3. DAPATKAN EPIC UNTUK TASK BARU (SATU PER SATU)
-        existing_epics = list(existing_df['Epic'].unique()) if not existing_df.empty else []
-        
-        all_processed_tasks = []
-        for index, row in intermediate_df.iterrows():
-            single_task_df = pd.DataFrame([row])
-            print(f"Memproses task: {row['Backlog'][:50]}...")
-            
-            processed_task = backlog_processor.get_epics_for_new_tasks(
-                intermediate_df=single_task_df,
-                existing_epics=existing_epics
-            )
-            
-            if processed_task is not None and not processed_task.empty:
-                all_processed_tasks.append(processed_task)
-            else:
-                print(f"Peringatan: Gagal memproses task tunggal. Melanjutkan...")
-
-        if not all_processed_tasks:
-            bot.send_message(ADMIN_TELEGRAM_ID, "Proses Gagal: Backlog Converter (LLM) tidak menghasilkan data valid untuk semua task.")
+from job_queue import JobQueue, JOB_REJECTED
+from metrics import REGISTRY, configure_logging
+from routing import Router
+from services import Services
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_SETTINGS = ['TELEGRAM_BOT_TOKEN', 'GEMINI_API_KEY', 'WEBHOOK_URL', 'BOT_USERNAME']
+# Hanya wajib jika ROUTES_FILE tidak diisi (mode satu tim)
+SINGLE_ROUTE_SETTINGS = ['GOOGLE_SHEET_ID', 'ADMIN_TELEGRAM_ID', 'TARGET_WORKSHEET_NAME']
+
+def load_config():
+    """Membaca konfigurasi dari environment/.env. Tidak membuka koneksi apa pun."""
+    load_dotenv()
+    return {
+        'TELEGRAM_BOT_TOKEN': os.getenv("TELEGRAM_BOT_TOKEN"),
+        'GEMINI_API_KEY': os.getenv("GEMINI_API_KEY"),
+        'GOOGLE_SHEET_ID': os.getenv("GOOGLE_SHEET_ID"),
+        'GOOGLE_CREDENTIALS_FILE': os.getenv("GOOGLE_CREDENTIALS_FILE", "credentials.json"),
+        'WEBHOOK_URL': os.getenv("WEBHOOK_URL"),
+        'ADMIN_TELEGRAM_ID': os.getenv("ADMIN_TELEGRAM_ID"),
+        'BOT_USERNAME': os.getenv("BOT_USERNAME"),
+        'TARGET_WORKSHEET_NAME': os.getenv("TARGET_WORKSHEET_NAME", "Backlog"),
+        'ROUTES_FILE': os.getenv("ROUTES_FILE"),
+        'LOG_LEVEL': os.getenv("LOG_LEVEL", "INFO"),
+        'LOG_FORMAT': os.getenv("LOG_FORMAT", "json"),
+        'SHEET_SNAPSHOT_MAX_AGE_SECONDS': int(os.getenv("SHEET_SNAPSHOT_MAX_AGE_SECONDS", "600")),
+        'JOB_WORKERS': int(os.getenv("JOB_WORKERS", "4")),
+        'JOB_QUEUE_MAX': int(os.getenv("JOB_QUEUE_MAX", "100")),
+        'JOB_QUEUE_MAX_PER_WORKSHEET': int(os.getenv("JOB_QUEUE_MAX_PER_WORKSHEET", "10")),
+        'COALESCE_WINDOW_SECONDS': float(os.getenv("COALESCE_WINDOW_SECONDS", "0")),
+        'TELEGRAM_API_URL': os.getenv("TELEGRAM_API_URL", "https://api.telegram.org"),
+        'TELEGRAM_TIMEOUT_SECONDS': float(os.getenv("TELEGRAM_TIMEOUT_SECONDS", "10")),
+        'ARCHIVE_DONE_AFTER_DAYS': int(os.getenv("ARCHIVE_DONE_AFTER_DAYS", "0")),
+        'ARCHIVE_MODE': os.getenv("ARCHIVE_MODE", "sheets"),
+        'ARCHIVE_PARQUET_DIR': os.getenv("ARCHIVE_PARQUET_DIR", "archive"),
+        'LLM_BATCH_SIZE': int(os.getenv("LLM_BATCH_SIZE", "20")),
+        'LLM_MAX_WORKERS': int(os.getenv("LLM_MAX_WORKERS", "0")) or None,
+        'EPIC_CANDIDATE_TOP_K': int(os.getenv("EPIC_CANDIDATE_TOP_K", "5")),
+        'EPIC_AUTO_ASSIGN_THRESHOLD': float(os.getenv("EPIC_AUTO_ASSIGN_THRESHOLD", "0.9")),
+        'EPIC_INDEX_MAX_DOCUMENTS': int(os.getenv("EPIC_INDEX_MAX_DOCUMENTS", "20000")),
+        'GEMINI_RPM_PER_KEY': int(os.getenv("GEMINI_RPM_PER_KEY", "10")),
+        'GEMINI_TPM_PER_KEY': int(os.getenv("GEMINI_TPM_PER_KEY", "250000")),
+        'EPIC_CACHE_PATH': os.getenv("EPIC_CACHE_PATH", "epic_cache.sqlite3"),
+        'EPIC_CACHE_MAX_ENTRIES': int(os.getenv("EPIC_CACHE_MAX_ENTRIES", "20000")),
+        'EPIC_CACHE_MAX_AGE_DAYS': int(os.getenv("EPIC_CACHE_MAX_AGE_DAYS", "90")),
+    }
+
+def load_router(config):
+    """Router dari ROUTES_FILE, atau satu route dari GOOGLE_SHEET_ID/TARGET_WORKSHEET_NAME/ADMIN_TELEGRAM_ID."""
+    if config.get('ROUTES_FILE'):
+        return Router.from_file(config['ROUTES_FILE'])
+    return Router.from_single(config['GOOGLE_SHEET_ID'], config['TARGET_WORKSHEET_NAME'], config['ADMIN_TELEGRAM_ID'])
+
+def create_app(config=None, warm_up=True):
+    """
+    Membuat aplikasi Flask. Client Telegram/Google/Gemini belum dibuat di sini; semuanya disiapkan
+    oleh Services saat pertama dibutuhkan, atau lebih awal oleh warm-up di background.
+    """
+    config = config or load_config()
+    required = REQUIRED_SETTINGS if config.get('ROUTES_FILE') else REQUIRED_SETTINGS + SINGLE_ROUTE_SETTINGS
+    if not all(config.get(name) for name in required):
+        raise ValueError("Satu atau lebih variabel konfigurasi penting tidak ditemukan di file .env.")
+    configure_logging(config.get('LOG_LEVEL', 'INFO'), config.get('LOG_FORMAT', 'json'))
+
+    router = load_router(config)
+
+    app = Flask(__name__)
+    services = Services(config)
+    # Minimal satu worker per worksheet: tim yang sedang menunggu Gemini tidak menahan tim lain
+    job_queue = JobQueue(
+        num_workers=max(config['JOB_WORKERS'], len(router)),
+        max_pending=config['JOB_QUEUE_MAX'],
+        coalesce_window_seconds=config['COALESCE_WINDOW_SECONDS'],
+        max_pending_per_key=config['JOB_QUEUE_MAX_PER_WORKSHEET']
+    )
+    app.extensions['backlog_bot'] = services
+    app.extensions['backlog_bot_router'] = router
+    bot_username = config['BOT_USERNAME']
+
+    def process_message_thread(route, data):
+        try:
+            pipeline = services.pipeline_for(route)
+        except Exception as e:
+            # Misalnya Google belum bisa dihubungi; laporkan ke pengirim alih-alih diam-diam gagal
+            logger.exception(f"Client untuk route '{route.name}' belum siap: {e}")
+            sender = data['message']['from']['id']
+            services.bot.send_message_async(sender, f"❌ Proses Gagal: Koneksi ke layanan belum siap.\n\nDetail: {e}")
             return
-            
-        new_tasks_with_epics_df = pd.concat(all_processed_tasks, ignore_index=True)
-
-        # 4. LOGIKA PERBANDINGAN MENGGUNAKAN KUNCI KANONIS
-        # --- PERBAIKAN KUNCI: Tambahkan pemeriksaan 'if not empty' ---
-        if not inprogress_tasks_df.empty:
-            inprogress_tasks_df['task_key'] = inprogress_tasks_df['PIC'].astype(str) + ' | ' + inprogress_tasks_df['Canonical Backlog'].astype(str)
-        else:
-            inprogress_tasks_df['task_key'] = None # Tambahkan kolom kosong jika tidak ada data
-
-        if not new_tasks_with_epics_df.empty:
-            new_tasks_with_epics_df['task_key'] = new_tasks_with_epics_df['PIC'].astype(str) + ' | ' + new_tasks_with_epics_df['Canonical Backlog'].astype(str)
-        else:
-            new_tasks_with_epics_df['task_key'] = None
-
-        merged_df = pd.merge(
-            inprogress_tasks_df, new_tasks_with_epics_df,
-            on='task_key', how='outer', suffixes=('_old', '_new'), indicator=True
-        ).reset_index(drop=True)
-
-        tasks_to_keep = []
-        today = datetime.now()
-
-        # A. Task yang selesai
-        completed_tasks_slice = merged_df[merged_df['_merge'] == 'left_only']
-        if not completed_tasks_slice.empty:
-            completed = completed_tasks_slice[[c for c in merged_df.columns if c.endswith('_old')]].copy()
-            completed.columns = [c.replace('_old', '') for c in completed.columns]
-            completed['Status'] = 'Done'
-            completed['End Date'] = today
-            tasks_to_keep.append(completed)
-
-        # B. Task yang masih berjalan
-        ongoing_tasks_slice = merged_df[merged_df['_merge'] == 'both']
-        if not ongoing_tasks_slice.empty:
-            ongoing = ongoing_tasks_slice[[c for c in merged_df.columns if c.endswith('_old')]].copy()
-            ongoing.columns = [c.replace('_old', '') for c in ongoing.columns]
-            tasks_to_keep.append(ongoing)
-
-        # C. Task yang benar-benar baru
-        brand_new_tasks_slice = merged_df[merged_df['_merge'] == 'right_only']
-        if not brand_new_tasks_slice.empty:
-            brand_new = brand_new_tasks_slice[[c for c in merged_df.columns if c.endswith('_new')]].copy()
-            brand_new.columns = [c.replace('_new', '') for c in brand_new.columns]
-            tasks_to_keep.append(brand_new)
-
-        # 5. GABUNGKAN SEMUA DATA
-        if tasks_to_keep:
-            final_inprogress_df = pd.concat(tasks_to_keep, ignore_index=True)
-            final_df = pd.concat([done_tasks_df, final_inprogress_df], ignore_index=True)
-        else:
-            final_df = done_tasks_df.copy()
-
-        final_df = final_df.drop(columns=['task_key', '_merge', 'Canonical Backlog'], errors='ignore')
-        final_df = final_df[required_cols]
-
-        # 6. SORTIR DAN FORMAT ULANG TANGGAL
-        final_df['Start Date'] = pd.to_datetime(final_df['Start Date'], errors='coerce')
-        final_df['End Date'] = pd.to_datetime(final_df['End Date'], errors='coerce')
-        
-        final_df = final_df.sort_values(by=['Start Date', 'Epic'], ascending=[True, True], na_position='last')
-        
-        final_df['Start Date'] = final_df['Start Date'].dt.strftime('%d %B %Y').fillna('')
-        final_df['End Date'] = final_df['End Date'].dt.strftime('%d %B %Y').fillna('')
-        
-        # 7. TULIS ULANG SELURUH WORKSHEET
-        rows_updated = sheets_client.overwrite_worksheet_with_df(
-            worksheet_name=WORKSHEET_NAME, 
-            data_df=final_df
-        )
-
-        feedback_message = f"✅ Sukses! Worksheet '{WORKSHEET_NAME}' telah di-update. Total {rows_updated} baris data."
-        bot.send_message(ADMIN_TELEGRAM_ID, feedback_message)
-
-    except Exception as e:
-        print(f"Error di thread pemrosesan: {e}")
-        bot.send_message(ADMIN_TELEGRAM_ID, f"❌ Proses Gagal: Terjadi error.\n\nDetail: {e}")
-
-@app.route('/webhook', methods=['POST'])
-def telegram_webhook():
-    data = request.get_json()
-    if 'message' in data and 'text' in data['message']:
-        text = data['message']['text']
-        if BOT_USERNAME and f"@{BOT_USERNAME}" in text:
-            thread = threading.Thread(target=process_message_thread, args=(data,))
-            thread.start()
-    return 'OK', 200
+        pipeline.process_message(data)
+
+    def collect_runtime_metrics():
+        """Nilai yang dibaca saat /metrics di-scrape: antrean job dan status circuit breaker per API key."""
+        stats = job_queue.get_stats()
+        yield 'backlog_bot_job_queue_depth', {}, stats['queue_depth']
+        for status in ('accepted', 'duplicates', 'rejected', 'superseded', 'completed', 'failed'):
+            yield 'backlog_bot_jobs_total', {'status': status}, stats[status]
+        yield 'backlog_bot_services_ready', {}, int(services.ready.is_set())
+        key_pool = services.peek('key_pool')
+        for key_stats in (key_pool.get_stats() if key_pool is not None else []):
+            yield 'backlog_bot_llm_key_circuit_open', {'key': key_stats['key']}, int(key_stats['circuit_open'])
+
+    REGISTRY.add_collector('runtime', collect_runtime_metrics)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics_endpoint():
+        return REGISTRY.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+    @app.route('/healthz', methods=['GET'])
+    def healthz():
+        # Selalu 200 selama proses hidup; 'ready' menunjukkan apakah client sudah selesai warm-up
+        return {'status': 'ok', 'ready': services.ready.is_set()}, 200
+
+    @app.route('/webhook', methods=['POST'])
+    def telegram_webhook():
+        data = request.get_json()
+        if 'message' in data and 'text' in data['message']:
+            message = data['message']
+            text = message['text']
+            if bot_username and f"@{bot_username}" in text:
+                chat_id = message.get('chat', {}).get('id', message['from']['id'])
+                route = router.resolve(chat_id, message['from']['id'])
+                if route is None:
+                    logger.warning(f"Tidak ada route untuk chat {chat_id} dan pengirim {message['from']['id']}. Pesan diabaikan.")
+                    return 'OK', 200
+                # Satu worksheet = satu key, sehingga siklus baca-ubah-tulis tidak saling balapan.
+                # Setiap laporan memuat seluruh task yang masih berjalan, jadi laporan terbaru
+                # dalam jendela coalescing cukup menggantikan laporan sebelumnya.
+                # update_id dipakai untuk mengabaikan webhook yang dikirim ulang oleh Telegram.
+                # Job menunggu client siap di worker, jadi webhook langsung dibalas tanpa menunggu warm-up.
+                status = job_queue.submit(route.key, process_message_thread, route, data, job_id=data.get('update_id'))
+                if status == JOB_REJECTED:
+                    # Non-2xx membuat Telegram mengirim ulang update ini nanti
+                    return 'Busy', 503
+        return 'OK', 200
+
+    if warm_up:
+        services.start_warm_up(router.routes)
+    return app
+
+_default_app = None
+_default_app_lock = threading.Lock()
+
+def __getattr__(name):
+    """`app.app` (misalnya `gunicorn app:app`) tetap tersedia; aplikasi baru dibuat saat pertama diakses."""
+    global _default_app
+    if name != 'app':
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _default_app_lock:
+        if _default_app is None:
+            _default_app = create_app()
+    return _default_app
 
 if __name__ == "__main__":
-    print("Mengatur webhook Telegram...")
-    bot.set_webhook(f"{WEBHOOK_URL}/webhook")
-    print(f"Server Flask siap menerima permintaan untuk worksheet: '{WORKSHEET_NAME}'")
-    app.run(host='0.0.0.0', port=5001)
\ No newline at end of file
+    flask_app = create_app()
+    services = flask_app.extensions['backlog_bot']
+    logger.info("Mengatur webhook Telegram...")
+    services.bot.set_webhook(f"{services.config['WEBHOOK_URL']}/webhook")
+    router = flask_app.extensions['backlog_bot_router']
+    logger.info(f"Server Flask siap menerima permintaan untuk {len(router)} route: {', '.join(route.name for route in router.routes)}")
+    flask_app.run(host='0.0.0.0', port=5001)
@@ -0,0 +1,86 @@
+# archiver.py
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+import pandas as pd
+from converters.date_parser import SHEET_DATE_FORMAT, parse_mixed_language_dates
+from converters.task_converter import create_canonical_text
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_MODE_SHEETS = 'sheets'
+ARCHIVE_MODE_PARQUET = 'parquet'
+
+def _archive_keys(data_df: pd.DataFrame) -> list[tuple[str, str, str]]:
+    """Kunci (PIC, Canonical Backlog, End Date) untuk mengenali baris yang sudah ada di arsip."""
+    end_dates = parse_mixed_language_dates(data_df['End Date']).dt.strftime('%Y-%m-%d').fillna('')
+    return list(zip(data_df['PIC'].astype(str), data_df['Backlog'].apply(create_canonical_text), end_dates))
+
+class DoneTaskArchiver:
+    """
+    Memindahkan task Done yang sudah lebih lama dari `archive_after_days` keluar dari worksheet utama,
+    ke worksheet arsip bulanan ('<worksheet> Arsip YYYY-MM') atau ke file Parquet lokal.
+    Dengan begitu worksheet utama hanya berisi task InProgress dan Done terbaru.
+    """
+    def __init__(self, sheets_client, archive_after_days: int, mode: str = ARCHIVE_MODE_SHEETS, parquet_dir: str = 'archive'):
+        if mode not in (ARCHIVE_MODE_SHEETS, ARCHIVE_MODE_PARQUET):
+            raise ValueError(f"Mode arsip '{mode}' tidak dikenal. Pilihan: '{ARCHIVE_MODE_SHEETS}' atau '{ARCHIVE_MODE_PARQUET}'.")
+        if mode == ARCHIVE_MODE_PARQUET:
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ValueError("Mode arsip 'parquet' membutuhkan library 'pyarrow'. Jalankan: pip install pyarrow")
+        self.sheets_client = sheets_client
+        self.archive_after_days = archive_after_days
+        self.mode = mode
+        self.parquet_dir = parquet_dir
+        logger.info(f"Arsip aktif: task Done lebih dari {archive_after_days} hari dipindahkan ke {mode}.")
+
+    def split(self, data_df: pd.DataFrame, today: datetime) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Memisahkan (baris yang tetap di worksheet utama, baris yang diarsipkan). 'End Date' harus bertipe datetime."""
+        cutoff = today - timedelta(days=self.archive_after_days)
+        is_archived = (data_df['Status'] == 'Done') & (data_df['End Date'] < cutoff)
+        return data_df[~is_archived], data_df[is_archived]
+
+    def _read_month(self, worksheet_name: str, month: str) -> pd.DataFrame:
+        """Isi arsip untuk satu bulan yang sudah tersimpan (kosong jika belum ada)."""
+        if self.mode == ARCHIVE_MODE_SHEETS:
+            return self.sheets_client.get_all_data_as_df(f"{worksheet_name} Arsip {month}")
+        month_dir = os.path.join(self.parquet_dir, worksheet_name, month)
+        if not os.path.isdir(month_dir) or not os.listdir(month_dir):
+            return pd.DataFrame()
+        return pd.read_parquet(month_dir)
+
+    def archive(self, archive_df: pd.DataFrame, worksheet_name: str) -> int:
+        """
+        Menyimpan baris arsip, dikelompokkan per bulan 'End Date'. Kolom tanggal harus bertipe datetime.
+        Baris yang sudah ada di arsip bulan tujuan dilewati, sehingga jika sinkronisasi worksheet utama
+        gagal setelah pengarsipan, pesan berikutnya tidak menggandakan baris arsip.
+        """
+        if archive_df.empty:
+            return 0
+        skipped = 0
+        months = archive_df['End Date'].dt.strftime('%Y-%m')
+        for month, month_df in archive_df.groupby(months, sort=True):
+            existing_df = self._read_month(worksheet_name, month)
+            if not existing_df.empty and {'PIC', 'Backlog', 'End Date'}.issubset(existing_df.columns):
+                archived_keys = set(_archive_keys(existing_df))
+                is_new = [key not in archived_keys for key in _archive_keys(month_df)]
+                skipped += len(month_df) - sum(is_new)
+                month_df = month_df[is_new]
+                if month_df.empty:
+                    continue
+            if self.mode == ARCHIVE_MODE_SHEETS:
+                sheet_df = month_df.copy()
+                sheet_df['Start Date'] = sheet_df['Start Date'].dt.strftime(SHEET_DATE_FORMAT).fillna('')
+                sheet_df['End Date'] = sheet_df['End Date'].dt.strftime(SHEET_DATE_FORMAT).fillna('')
+                self.sheets_client.append_rows_to_worksheet(f"{worksheet_name} Arsip {month}", sheet_df)
+            else:
+                # Satu file part per penulisan, sehingga arsip tidak perlu dibaca ulang untuk ditambah
+                month_dir = os.path.join(self.parquet_dir, worksheet_name, month)
+                os.makedirs(month_dir, exist_ok=True)
+                month_df.to_parquet(os.path.join(month_dir, f"part-{uuid.uuid4().hex}.parquet"), index=False)
+        logger.info(f"{len(archive_df)} task Done diarsipkan ({self.mode})"
+                    + (f", {skipped} di antaranya sudah ada di arsip." if skipped else "."))
+        return len(archive_df)
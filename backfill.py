@@ -0,0 +1,332 @@
+# backfill.py
+"""
+Mengimpor laporan harian lama dari export chat Telegram (Telegram Desktop -> Export chat history -> JSON)
+ke worksheet backlog sekaligus, tanpa mengirimnya satu per satu lewat /webhook.
+
+Export dibaca bertahap dan laporan diputar ulang sesuai urutan tanggal di memori: task yang tidak lagi
+dilaporkan menjadi Done dengan End Date = tanggal pesan, persis seperti saat bot berjalan. Epic baru
+ditetapkan di akhir untuk backlog unik dalam batch besar, lalu worksheet ditulis satu kali.
+Progres disimpan ke file checkpoint, sehingga impor yang terputus bisa dilanjutkan dengan perintah yang sama.
+
+Jalankan dari root proyek saat bot tidak sedang memproses laporan untuk worksheet yang sama:
+
+    python backfill.py result.json --route tim-mobile
+    python backfill.py result.json --dry-run
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+from datetime import datetime
+import pandas as pd
+
+from converters.date_parser import parse_mixed_language_dates
+from converters.reconciler import TaskIndex, task_keys
+from pipeline import (REQUIRED_COLUMNS, parse_report, prepare_existing_df, merge_parts,
+                      sort_for_sheet, format_dates_for_sheet)
+
+logger = logging.getLogger(__name__)
+
+STATE_COLUMNS = REQUIRED_COLUMNS + ['Canonical Backlog']
+CHECKPOINT_VERSION = 1
+
+_MESSAGES_START = re.compile(r'"messages"\s*:\s*\[')
+_SEPARATORS = re.compile(r'[\s,]*')
+
+def iter_export_messages(path, chunk_size=1 << 20):
+    """
+    Menghasilkan pesan dari array "messages" di file export satu per satu, tanpa memuat seluruh
+    file ke memori. File dibaca per `chunk_size` karakter dan setiap pesan di-decode begitu lengkap.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding='utf-8') as f:
+        buffer = ''
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                raise ValueError(f"'{path}' bukan export chat Telegram (array 'messages' tidak ditemukan).")
+            buffer += chunk
+            match = _MESSAGES_START.search(buffer)
+            if match:
+                position = match.end()
+                break
+            # Sisakan ekor buffer untuk kunci "messages" yang terpotong di batas chunk
+            buffer = buffer[-64:]
+
+        while True:
+            position = _SEPARATORS.match(buffer, position).end()
+            if buffer.startswith(']', position):
+                return
+            try:
+                message, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            yield message
+
+def message_text(message):
+    """Teks pesan export; teks berformat disimpan Telegram sebagai list potongan string/entitas."""
+    text = message.get('text', '')
+    if isinstance(text, list):
+        return ''.join(part if isinstance(part, str) else part.get('text', '') for part in text)
+    return text
+
+def sender_id(message):
+    """'user123456' -> '123456'."""
+    return str(message.get('from_id', '')).removeprefix('user')
+
+def _rows_for_checkpoint(df):
+    """Baris state dengan tanggal diformat seperti di sheet, agar checkpoint bisa disimpan sebagai JSON."""
+    if df.empty:
+        return []
+    df = df.reindex(columns=STATE_COLUMNS).copy()
+    df['Start Date'] = parse_mixed_language_dates(df['Start Date'])
+    df['End Date'] = parse_mixed_language_dates(df['End Date'])
+    return format_dates_for_sheet(df).fillna('').astype(str).values.tolist()
+
+class BacklogBackfill:
+    """
+    Memutar ulang laporan dari export Telegram ke satu worksheet memakai komponen BacklogPipeline
+    (sheets client, BacklogProcessor, epic cache/index, arsip) milik route tersebut.
+    """
+    def __init__(self, pipeline, checkpoint_path, checkpoint_every=25, require_mention=False):
+        self.pipeline = pipeline
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.require_mention = require_mention
+        self.task_index = None
+        self.done_parts = []
+        self.last_message_id = None
+        self.last_message_date = None
+        self.stats = {'reports': 0, 'skipped': 0, 'out_of_order': 0}
+
+    # --- State & checkpoint ---
+
+    def load_state(self):
+        """Melanjutkan dari checkpoint jika ada; jika tidak, mulai dari isi worksheet saat ini."""
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('version') != CHECKPOINT_VERSION or checkpoint.get('route') != self.pipeline.name:
+                raise ValueError(f"Checkpoint '{self.checkpoint_path}' bukan milik route '{self.pipeline.name}'.")
+            self.done_parts = [pd.DataFrame(checkpoint['done'], columns=STATE_COLUMNS)]
+            self.task_index = TaskIndex(pd.DataFrame(checkpoint['inprogress'], columns=STATE_COLUMNS))
+            self.last_message_id = checkpoint['last_message_id']
+            self.last_message_date = datetime.fromisoformat(checkpoint['last_message_date']) if checkpoint['last_message_date'] else None
+            self.stats = checkpoint['stats']
+            logger.info(f"Melanjutkan dari checkpoint: {self.stats['reports']} laporan sudah diputar ulang "
+                        f"(pesan terakhir #{self.last_message_id}).")
+            return
+
+        existing_df = self.pipeline.sheets_client.get_all_data_as_df(worksheet_name=self.pipeline.worksheet_name)
+        if existing_df.empty:
+            logger.info("Worksheet kosong. Backfill dimulai dari data kosong.")
+            existing_df = pd.DataFrame(columns=STATE_COLUMNS)
+        else:
+            existing_df = prepare_existing_df(existing_df)
+        self.done_parts = [existing_df[existing_df['Status'] == 'Done'].reset_index(drop=True)]
+        self.task_index = TaskIndex(existing_df[existing_df['Status'] == 'InProgress'])
+        logger.info(f"Mulai dari worksheet: {len(existing_df)} baris ({len(self.task_index)} InProgress).")
+
+    def _done_df(self):
+        parts = [df for df in self.done_parts if not df.empty]
+        self.done_parts = [pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=STATE_COLUMNS)]
+        return self.done_parts[0]
+
+    def save_checkpoint(self):
+        checkpoint = {
+            'version': CHECKPOINT_VERSION,
+            'route': self.pipeline.name,
+            'last_message_id': self.last_message_id,
+            'last_message_date': self.last_message_date.isoformat() if self.last_message_date else None,
+            'stats': self.stats,
+            'done': _rows_for_checkpoint(self._done_df()),
+            'inprogress': _rows_for_checkpoint(self.task_index.tasks_df),
+        }
+        # Tulis ke file sementara lalu ganti, agar checkpoint tidak pernah setengah tertulis
+        temp_path = f"{self.checkpoint_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, ensure_ascii=False)
+        os.replace(temp_path, self.checkpoint_path)
+        logger.info(f"Checkpoint disimpan: {self.stats['reports']} laporan, pesan terakhir #{self.last_message_id}.")
+
+    # --- Tahap-tahap backfill ---
+
+    def replay(self, messages, save_checkpoints=True):
+        """Menerapkan laporan admin dari export secara berurutan ke state di memori."""
+        since_checkpoint = 0
+        for message in messages:
+            if message.get('type') != 'message' or sender_id(message) not in self.pipeline.admin_ids:
+                continue
+            if self.last_message_id is not None and message['id'] <= self.last_message_id:
+                continue  # Sudah diterapkan sebelum checkpoint
+            message_date = datetime.fromisoformat(message['date'])
+            if self.last_message_date is not None and message_date < self.last_message_date:
+                # Laporan lama setelah laporan yang lebih baru akan salah menandai task sebagai Done
+                logger.warning(f"Pesan #{message['id']} ({message['date']}) tidak urut tanggal. Dilewati.")
+                self.stats['out_of_order'] += 1
+                continue
+
+            text = message_text(message)
+            if self.require_mention and f"@{self.pipeline.bot_username}" not in text:
+                continue
+            intermediate_df = parse_report(text, self.pipeline.bot_username)
+            self.last_message_id = message['id']
+            if intermediate_df.empty:
+                self.stats['skipped'] += 1
+                continue
+
+            changeset = self.task_index.reconcile(intermediate_df, today=message_date)
+            self.done_parts.append(changeset.completed)
+            self.task_index = self.task_index.apply(changeset)
+            self.last_message_date = message_date
+            self.stats['reports'] += 1
+
+            since_checkpoint += 1
+            if save_checkpoints and since_checkpoint >= self.checkpoint_every:
+                self.save_checkpoint()
+                since_checkpoint = 0
+
+        if save_checkpoints:
+            self.save_checkpoint()
+        logger.info(f"Replay selesai: {self.stats['reports']} laporan diterapkan, {self.stats['skipped']} pesan admin "
+                    f"tanpa task, {self.stats['out_of_order']} pesan tidak urut dilewati.")
+
+    def _all_tasks_df(self):
+        return pd.concat([self._done_df(), self.task_index.tasks_df], ignore_index=True)
+
+    def pending_tasks(self):
+        """Backlog unik (PIC, Canonical Backlog) yang belum memiliki Epic."""
+        all_df = self._all_tasks_df()
+        has_epic = all_df['Epic'].fillna('').astype(str).str.strip() != ''
+        return all_df[~has_epic].drop_duplicates(subset=['PIC', 'Canonical Backlog']).reset_index(drop=True)
+
+    def classify(self):
+        """Menetapkan Epic untuk semua backlog unik tanpa Epic dalam batch besar. Mengembalikan True jika lengkap."""
+        all_df = self._all_tasks_df()
+        has_epic = all_df['Epic'].fillna('').astype(str).str.strip() != ''
+        known_df = all_df[has_epic]
+        if self.pipeline.epic_cache is not None:
+            self.pipeline.epic_cache.seed_from_df(known_df)
+        if self.pipeline.epic_index is not None:
+            self.pipeline.epic_index.update_from_df(known_df)
+
+        pending_df = self.pending_tasks()
+        if pending_df.empty:
+            return True
+        logger.info(f"Menetapkan Epic untuk {len(pending_df)} backlog unik...")
+        existing_epics = list(known_df['Epic'].astype(str).str.strip().unique())
+        classified_df = self.pipeline.backlog_processor.get_epics_for_tasks_batched(
+            intermediate_df=pending_df[['Backlog', 'Canonical Backlog', 'PIC', 'Status', 'Start Date', 'End Date']],
+            existing_epics=existing_epics
+        )
+        classified = dict(zip(task_keys(classified_df), classified_df['Epic'])) if classified_df is not None else {}
+        # Hanya Epic untuk kunci yang memang diminta; baris hasil dengan kunci lain tidak dihitung lengkap
+        epics = {}
+        for key in task_keys(pending_df):
+            epic = classified.get(key)
+            if isinstance(epic, str) and epic.strip():
+                epics[key] = epic.strip()
+
+        def fill_epics(df):
+            if df.empty:
+                return df
+            df = df.copy()
+            df['Epic'] = [epic if isinstance(epic, str) and epic.strip() else epics.get(key, '')
+                          for epic, key in zip(df['Epic'].tolist(), task_keys(df))]
+            return df
+
+        self.done_parts = [fill_epics(self._done_df())]
+        self.task_index = TaskIndex(fill_epics(self.task_index.tasks_df))
+        missing = len(pending_df) - len(epics)  # pending_df unik per kunci
+        if missing > 0:
+            logger.error(f"{missing} backlog belum mendapat Epic dari LLM.")
+            return False
+        return True
+
+    def write(self):
+        """Menulis hasil akhir ke worksheet satu kali. Mengembalikan statistik penulisan."""
+        # Baca ulang sebelum menulis: saat melanjutkan dari checkpoint belum ada snapshot (sync akan
+        # menimpa seluruh worksheet), dan replay yang lama bisa membuat snapshot tidak cocok lagi
+        # dengan isi sheet. Jika snapshot masih valid, ini hanya satu cek revisi.
+        self.pipeline.sheets_client.get_all_data_as_df(worksheet_name=self.pipeline.worksheet_name)
+        final_df = sort_for_sheet(merge_parts([self._done_df(), self.task_index.tasks_df]))
+        archived_count = 0
+        if self.pipeline.archiver is not None:
+            final_df, archive_df = self.pipeline.archiver.split(final_df, today=datetime.now())
+            archived_count = self.pipeline.archiver.archive(archive_df, worksheet_name=self.pipeline.worksheet_name)
+        sync_stats = self.pipeline.sheets_client.sync_worksheet_with_df(
+            worksheet_name=self.pipeline.worksheet_name,
+            data_df=format_dates_for_sheet(final_df)
+        )
+        sync_stats['archived'] = archived_count
+        return sync_stats
+
+    def run(self, messages, dry_run=False):
+        """Menjalankan replay -> Epic -> tulis. Mengembalikan kode keluar untuk CLI."""
+        self.load_state()
+        self.replay(messages, save_checkpoints=not dry_run)
+        if dry_run:
+            logger.info(f"Dry run: {len(self._done_df())} task selesai, {len(self.task_index)} InProgress, "
+                        f"{len(self.pending_tasks())} backlog unik perlu Epic. Worksheet tidak diubah.")
+            return 0
+
+        if not self.classify():
+            self.save_checkpoint()
+            logger.error("Worksheet tidak ditulis. Jalankan ulang perintah yang sama untuk mencoba lagi; "
+                         "Epic yang sudah didapat tersimpan di epic cache.")
+            return 1
+
+        sync_stats = self.write()
+        os.remove(self.checkpoint_path)
+        logger.info(f"Backfill selesai: worksheet '{self.pipeline.worksheet_name}' berisi {sync_stats['rows']} baris "
+                    f"({self.stats['reports']} laporan diputar ulang, {sync_stats['archived']} task diarsipkan).")
+        return 0
+
+def main():
+    from app import SINGLE_ROUTE_SETTINGS, load_config, load_router
+    from metrics import configure_logging
+    from services import Services
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('export', help="File result.json dari export chat Telegram")
+    parser.add_argument('--route', help="Nama route tujuan (wajib jika ROUTES_FILE berisi lebih dari satu route)")
+    parser.add_argument('--checkpoint', help="Lokasi file checkpoint (default: <export>.<route>.checkpoint.json)")
+    parser.add_argument('--checkpoint-every', type=int, default=25, help="Simpan checkpoint setiap N laporan")
+    parser.add_argument('--llm-batch-size', type=int, default=100, help="Jumlah backlog per prompt Gemini")
+    parser.add_argument('--require-mention', action='store_true', help="Hanya pesan yang me-mention bot")
+    parser.add_argument('--dry-run', action='store_true', help="Putar ulang tanpa memanggil Gemini atau menulis sheet")
+    args = parser.parse_args()
+
+    config = load_config()
+    required = ['GEMINI_API_KEY'] + ([] if config.get('ROUTES_FILE') else SINGLE_ROUTE_SETTINGS)
+    if not all(config.get(name) for name in required):
+        parser.error("Satu atau lebih variabel konfigurasi penting tidak ditemukan di file .env.")
+    config['LLM_BATCH_SIZE'] = args.llm_batch_size
+    configure_logging(config['LOG_LEVEL'], 'text')
+
+    router = load_router(config)
+    routes = {route.name: route for route in router.routes}
+    if args.route is None and len(routes) > 1:
+        parser.error(f"--route wajib diisi. Pilihan: {', '.join(routes)}")
+    route = routes.get(args.route) if args.route else router.routes[0]
+    if route is None:
+        parser.error(f"Route '{args.route}' tidak ditemukan. Pilihan: {', '.join(routes)}")
+
+    pipeline = Services(config).pipeline_for(route)
+    backfill = BacklogBackfill(
+        pipeline,
+        checkpoint_path=args.checkpoint or f"{args.export}.{route.name}.checkpoint.json",
+        checkpoint_every=args.checkpoint_every,
+        require_mention=args.require_mention
+    )
+    sys.exit(backfill.run(iter_export_messages(args.export), dry_run=args.dry_run))
+
+if __name__ == "__main__":
+    main()
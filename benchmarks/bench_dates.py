@@ -0,0 +1,80 @@
+# benchmarks/bench_dates.py
+"""
+Membandingkan normalisasi tanggal lama (apply per sel + pd.to_datetime tebak format)
+dengan parse_mixed_language_dates. Parser baru diukur dua kali: "dingin" (cache tanggal hasil
+parse dikosongkan sebelum setiap pengulangan) dan "hangat" (semua nilai sudah ada di cache, seperti
+pesan berikutnya pada proses yang sama). Jalankan dari root proyek:
+
+    python -m benchmarks.bench_dates
+"""
+import random
+import time
+import pandas as pd
+
+from converters import date_parser
+from converters.date_parser import parse_mixed_language_dates
+
+MONTHS_ID = ['Januari', 'Februari', 'Maret', 'April', 'Mei', 'Juni', 'Juli',
+             'Agustus', 'September', 'Oktober', 'November', 'Desember']
+MONTHS_EN = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+             'August', 'September', 'October', 'November', 'December']
+
+def legacy_convert_mixed_language_date(date_str):
+    """Salinan implementasi lama untuk pembanding."""
+    if not isinstance(date_str, str) or not date_str.strip():
+        return None
+    month_map = {
+        'januari': 'January', 'februari': 'February', 'maret': 'March',
+        'april': 'April', 'mei': 'May', 'juni': 'June',
+        'juli': 'July', 'agustus': 'August', 'september': 'September',
+        'oktober': 'October', 'november': 'November', 'desember': 'December'
+    }
+    processed_str = date_str.lower()
+    for id_month, en_month in month_map.items():
+        processed_str = processed_str.replace(id_month, en_month)
+    return processed_str
+
+def legacy_parse(values):
+    return values.apply(legacy_convert_mixed_language_date).pipe(pd.to_datetime, errors='coerce')
+
+def make_column(num_rows, num_distinct=400, seed=42):
+    rng = random.Random(seed)
+    distinct = []
+    for _ in range(num_distinct):
+        months = rng.choice([MONTHS_ID, MONTHS_EN])
+        distinct.append(f"{rng.randint(1, 28)} {rng.choice(months)} {rng.randint(2023, 2026)}")
+    distinct.append('')
+    return pd.Series([rng.choice(distinct) for _ in range(num_rows)], dtype=object)
+
+def clear_parse_cache():
+    with date_parser._parsed_cache_lock:
+        date_parser._parsed_cache.clear()
+
+def best_of(func, values, repeat=3, setup=None):
+    """Waktu terbaik dari `repeat` pengulangan; `setup` dijalankan sebelum tiap pengulangan, di luar pengukuran."""
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func(values)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    print(f"{'baris':>10} {'lama (s)':>10} {'dingin (s)':>11} {'speedup':>8} {'hangat (s)':>11} {'speedup':>8}")
+    for num_rows in (10_000, 100_000, 1_000_000):
+        values = make_column(num_rows)
+        legacy_result = legacy_parse(values)
+        clear_parse_cache()
+        new_result = parse_mixed_language_dates(values)
+        assert legacy_result.fillna(pd.Timestamp(0)).equals(new_result.fillna(pd.Timestamp(0)).astype(legacy_result.dtype)), "Hasil berbeda"
+        legacy_seconds = best_of(legacy_parse, values)
+        cold_seconds = best_of(parse_mixed_language_dates, values, setup=clear_parse_cache)
+        parse_mixed_language_dates(values)  # Mengisi cache untuk pengukuran hangat
+        warm_seconds = best_of(parse_mixed_language_dates, values)
+        print(f"{num_rows:>10} {legacy_seconds:>10.3f} {cold_seconds:>11.3f} {legacy_seconds / cold_seconds:>7.1f}x "
+              f"{warm_seconds:>11.3f} {legacy_seconds / warm_seconds:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
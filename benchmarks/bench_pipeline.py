@@ -0,0 +1,131 @@
+# benchmarks/bench_pipeline.py
+"""
+Benchmark end-to-end BacklogPipeline tanpa kredensial: Google Sheets, Telegram, dan Gemini
+diganti client in-memory dengan latensi yang bisa diatur. Sheet dan laporan dibuat secara sintetis
+untuk beberapa ukuran, lalu durasi setiap tahap dilaporkan sebagai p50/p99. Jalankan dari root proyek:
+
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --sheet-rows 1000 50000 --runs 50 --llm-latency-ms 800
+"""
+import argparse
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+from benchmarks.fakes import FakeSheetsClient, FakeTelegramBot
+from converters.backlog_converter import BacklogProcessor
+from converters.date_parser import SHEET_DATE_FORMAT
+from converters.epic_index import EpicIndex
+from converters.llm_backend import FakeLLMBackend, KeyPool
+from pipeline import BacklogPipeline, STAGES
+
+WORKSHEET_NAME = 'Backlog'
+ADMIN_CHAT_ID = '1'
+BOT_USERNAME = 'benchbot'
+HEADER = ['Epic', 'Backlog', 'PIC', 'Status', 'Start Date', 'End Date']
+TOPICS = ['setup', 'integrasi', 'perbaikan', 'migrasi', 'laporan', 'desain', 'testing', 'deploy']
+OBJECTS = ['modul login', 'dashboard admin', 'api pembayaran', 'notifikasi email', 'halaman profil',
+           'export excel', 'sinkronisasi data', 'role akses']
+MONTHS_ID = ['Januari', 'Februari', 'Maret', 'April', 'Mei', 'Juni', 'Juli',
+             'Agustus', 'September', 'Oktober', 'November', 'Desember']
+
+def make_backlog(number):
+    topic = TOPICS[number % len(TOPICS)]
+    return topic, f"{topic} {OBJECTS[(number // len(TOPICS)) % len(OBJECTS)]} {number}"
+
+def make_sheet(num_rows, num_pics=10, done_ratio=0.7, seed=0):
+    """Grid worksheet (header + baris) dengan campuran task Done dan InProgress."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    grid = [HEADER]
+    for number in range(num_rows):
+        topic, backlog = make_backlog(number)
+        start_date = start + timedelta(days=rng.randrange(270))
+        if rng.random() < done_ratio:
+            end_date = (start_date + timedelta(days=rng.randrange(1, 30))).strftime(SHEET_DATE_FORMAT)
+            status = 'Done'
+        else:
+            end_date, status = '', 'InProgress'
+        grid.append([f"Epic {topic.title()}", backlog, f"PIC {number % num_pics}", status,
+                     start_date.strftime(SHEET_DATE_FORMAT), end_date])
+    return grid
+
+def make_report(grid, num_tasks, new_ratio=0.3, seed=0):
+    """Teks laporan Telegram: sebagian task InProgress dari sheet dilaporkan ulang, sisanya task baru."""
+    rng = random.Random(seed)
+    inprogress = [row for row in grid[1:] if row[3] == 'InProgress']
+    num_new = int(num_tasks * new_ratio)
+    reported = rng.sample(inprogress, min(len(inprogress), num_tasks - num_new))
+    # Jika task InProgress kurang, kekurangannya diisi task baru
+    num_new = num_tasks - len(reported)
+    for number in range(len(grid), len(grid) + num_new):
+        reported.append([None, make_backlog(number)[1], f"PIC {number % 10}"])
+
+    tasks_by_pic = {}
+    for row in reported:
+        tasks_by_pic.setdefault(row[2], []).append(row[1])
+    lines = [f"17 - {MONTHS_ID[8]} - 2025"]
+    for position, (pic, backlogs) in enumerate(sorted(tasks_by_pic.items()), start=1):
+        lines.append(f"{position}. {pic}")
+        lines.extend(f"- {backlog}" for backlog in backlogs)
+    lines.append(f"@{BOT_USERNAME}")
+    return "\n".join(lines), num_new
+
+def run_once(grid, update, args):
+    """Membangun pipeline baru dengan client palsu dan memproses satu update. Mengembalikan durasi per tahap."""
+    sheets_client = FakeSheetsClient({WORKSHEET_NAME: grid}, latency_seconds=args.sheets_latency_ms / 1000)
+    bot = FakeTelegramBot(latency_seconds=args.telegram_latency_ms / 1000)
+    backends = [FakeLLMBackend(f"fake-{i}", latency_seconds=args.llm_latency_ms / 1000, seed=i) for i in range(args.keys)]
+    epic_index = EpicIndex()
+    processor = BacklogProcessor(
+        key_pool=KeyPool(backends, requests_per_minute=10 ** 6, tokens_per_minute=10 ** 9),
+        epic_index=epic_index,
+        batch_size=args.batch_size
+    )
+    pipeline = BacklogPipeline(bot, sheets_client, processor, WORKSHEET_NAME, ADMIN_CHAT_ID, BOT_USERNAME,
+                               epic_index=epic_index)
+
+    started = time.perf_counter()
+    ok = pipeline.process_message(update)
+    timings = dict(pipeline.last_timings, total=time.perf_counter() - started)
+    if not ok:
+        raise RuntimeError(f"Pipeline gagal: {bot.sent_messages[-1][1] if bot.sent_messages else '-'}")
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sheet-rows', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--report-tasks', type=int, default=50)
+    parser.add_argument('--new-ratio', type=float, default=0.3)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--keys', type=int, default=2, help="Jumlah API key palsu di KeyPool")
+    parser.add_argument('--batch-size', type=int, default=20)
+    parser.add_argument('--llm-latency-ms', type=float, default=0)
+    parser.add_argument('--sheets-latency-ms', type=float, default=0)
+    parser.add_argument('--telegram-latency-ms', type=float, default=0)
+    parser.add_argument('--verbose', action='store_true', help="Tampilkan log pipeline")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR)
+
+    for num_rows in args.sheet_rows:
+        grid = make_sheet(num_rows)
+        text, num_new = make_report(grid, args.report_tasks, args.new_ratio)
+        update = {'update_id': 1, 'message': {'text': text, 'from': {'id': int(ADMIN_CHAT_ID)}}}
+
+        samples = {name: [] for name in STAGES + ['total']}
+        for _ in range(args.runs):
+            timings = run_once(grid, update, args)
+            for name, seconds in timings.items():
+                samples[name].append(seconds)
+
+        print(f"\nSheet {num_rows} baris, laporan {args.report_tasks} task ({num_new} baru), {args.runs} run")
+        print(f"{'tahap':<14} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+        for name, values in samples.items():
+            if values:
+                p50, p99 = np.percentile(values, [50, 99]) * 1000
+                print(f"{name:<14} {p50:>10.2f} {p99:>10.2f}")
+
+if __name__ == "__main__":
+    main()
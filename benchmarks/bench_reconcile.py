@@ -0,0 +1,78 @@
+# benchmarks/bench_reconcile.py
+"""
+Membandingkan rekonsiliasi lama (pd.merge outer + slicing kolom _old/_new)
+dengan TaskIndex. Jalankan dari root proyek:
+
+    python -m benchmarks.bench_reconcile
+"""
+import time
+from datetime import datetime
+import pandas as pd
+
+from converters.reconciler import TaskIndex
+
+COLUMNS = ['Epic', 'Backlog', 'PIC', 'Status', 'Start Date', 'End Date', 'Canonical Backlog']
+
+def legacy_reconcile(inprogress_tasks_df, new_tasks_with_epics_df, today):
+    """Salinan langkah 4 lama di process_message_thread untuk pembanding."""
+    inprogress_tasks_df = inprogress_tasks_df.copy()
+    new_tasks_with_epics_df = new_tasks_with_epics_df.copy()
+    inprogress_tasks_df['task_key'] = inprogress_tasks_df['PIC'].astype(str) + ' | ' + inprogress_tasks_df['Canonical Backlog'].astype(str)
+    new_tasks_with_epics_df['task_key'] = new_tasks_with_epics_df['PIC'].astype(str) + ' | ' + new_tasks_with_epics_df['Canonical Backlog'].astype(str)
+    merged_df = pd.merge(
+        inprogress_tasks_df, new_tasks_with_epics_df,
+        on='task_key', how='outer', suffixes=('_old', '_new'), indicator=True
+    ).reset_index(drop=True)
+
+    tasks_to_keep = []
+    completed = merged_df[merged_df['_merge'] == 'left_only'][[c for c in merged_df.columns if c.endswith('_old')]].copy()
+    completed.columns = [c.replace('_old', '') for c in completed.columns]
+    completed['Status'] = 'Done'
+    completed['End Date'] = today
+    tasks_to_keep.append(completed)
+    ongoing = merged_df[merged_df['_merge'] == 'both'][[c for c in merged_df.columns if c.endswith('_old')]].copy()
+    ongoing.columns = [c.replace('_old', '') for c in ongoing.columns]
+    tasks_to_keep.append(ongoing)
+    brand_new = merged_df[merged_df['_merge'] == 'right_only'][[c for c in merged_df.columns if c.endswith('_new')]].copy()
+    brand_new.columns = [c.replace('_new', '') for c in brand_new.columns]
+    tasks_to_keep.append(brand_new)
+    return pd.concat(tasks_to_keep, ignore_index=True)
+
+def indexed_reconcile(inprogress_tasks_df, new_tasks_df, today):
+    changeset = TaskIndex(inprogress_tasks_df).reconcile(new_tasks_df, today)
+    return pd.concat([changeset.completed, changeset.ongoing, changeset.new], ignore_index=True)
+
+def make_tasks(start, stop, num_pics=50):
+    numbers = range(start, stop)
+    return pd.DataFrame({
+        'Epic': [f"Epic {n % 40}" for n in numbers],
+        'Backlog': [f"Task {n}" for n in numbers],
+        'PIC': [f"PIC {n % num_pics}" for n in numbers],
+        'Status': 'InProgress',
+        'Start Date': pd.Timestamp('2025-09-01'),
+        'End Date': pd.NaT,
+        'Canonical Backlog': [f"task {n}" for n in numbers],
+    }, columns=COLUMNS)
+
+def best_of(func, *args, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main():
+    today = datetime.now()
+    print(f"{'baris':>8} {'merge (s)':>10} {'index (s)':>10} {'speedup':>8}")
+    for num_rows in (1_000, 10_000, 100_000, 500_000):
+        # Sepertiga task selesai, sisanya masih berjalan, ditambah sepertiga task baru
+        inprogress_df = make_tasks(0, num_rows)
+        reported_df = make_tasks(num_rows // 3, num_rows + num_rows // 3)
+        legacy_seconds, legacy_result = best_of(legacy_reconcile, inprogress_df, reported_df, today)
+        index_seconds, index_result = best_of(indexed_reconcile, inprogress_df, reported_df, today)
+        assert sorted(legacy_result['Canonical Backlog']) == sorted(index_result['Canonical Backlog']), "Hasil berbeda"
+        print(f"{num_rows:>8} {legacy_seconds:>10.3f} {index_seconds:>10.3f} {legacy_seconds / index_seconds:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/bench_startup.py
+"""
+Mengukur cold start app.py: lama `import app`, `create_app()` (tanpa warm-up), dan respons webhook
+pertama, masing-masing di proses Python baru. Keluar dengan kode 1 jika median import + create_app
+melebihi anggaran, sehingga bisa dipakai sebagai pemeriksaan sebelum deploy. Jalankan dari root proyek:
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --budget-ms 300 --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Library berat yang seharusnya baru dimuat saat client dibuat, bukan saat import app
+HEAVY_MODULES = ['pandas', 'gspread', 'google.generativeai', 'requests']
+
+FAKE_ENV = {
+    'TELEGRAM_BOT_TOKEN': 'bench', 'GEMINI_API_KEY': 'bench', 'GOOGLE_SHEET_ID': 'bench',
+    'WEBHOOK_URL': 'https://bench.invalid', 'ADMIN_TELEGRAM_ID': '1', 'BOT_USERNAME': 'benchbot',
+    'TARGET_WORKSHEET_NAME': 'Backlog', 'LOG_LEVEL': 'WARNING',
+}
+
+MEASURE_SCRIPT = f"""
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+flask_app = app.create_app(warm_up=False)
+created = time.perf_counter()
+response = flask_app.test_client().post('/webhook', json={{'update_id': 1, 'message': {{'text': 'halo', 'from': {{'id': 1}}}}}})
+responded = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'create_ms': (created - imported) * 1000,
+    'first_response_ms': (responded - created) * 1000,
+    'status': response.status_code,
+    'heavy_loaded': [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+}}))
+"""
+
+def run_python(args, env):
+    return subprocess.run([sys.executable, *args], env=env, capture_output=True, text=True, check=True)
+
+def top_imports(env, limit):
+    """Modul tingkat atas dengan waktu import kumulatif terbesar menurut `python -X importtime`."""
+    result = run_python(['-X', 'importtime', '-c', 'import app'], env)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Indentasi nama menunjukkan kedalaman import; ambil app dan modul yang diimpor langsung olehnya
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 1:
+            entries.append((int(cumulative), name.strip()))
+    return sorted(entries, reverse=True)[:limit]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=500, help="Anggaran median import + create_app (ms)")
+    parser.add_argument('--top', type=int, default=10, help="Jumlah modul terberat yang ditampilkan")
+    args = parser.parse_args()
+
+    env = dict(os.environ, **FAKE_ENV)
+    samples = [json.loads(run_python(['-c', MEASURE_SCRIPT], env).stdout.strip().splitlines()[-1]) for _ in range(args.runs)]
+
+    print(f"{'tahap':<20} {'median (ms)':>12} {'maks (ms)':>10}")
+    for name in ('import_ms', 'create_ms', 'first_response_ms'):
+        values = [sample[name] for sample in samples]
+        print(f"{name:<20} {statistics.median(values):>12.1f} {max(values):>10.1f}")
+    heavy_loaded = sorted({name for sample in samples for name in sample['heavy_loaded']})
+    print(f"Status webhook pertama: {samples[-1]['status']}")
+    print(f"Library berat yang ikut dimuat saat import: {', '.join(heavy_loaded) or '-'}")
+
+    print(f"\nModul terberat (kumulatif, dari -X importtime):")
+    for cumulative_us, name in top_imports(env, args.top):
+        print(f"  {cumulative_us / 1000:>8.1f} ms  {name}")
+
+    startup_ms = statistics.median(sample['import_ms'] + sample['create_ms'] for sample in samples)
+    verdict = "OK" if startup_ms <= args.budget_ms else "MELEBIHI ANGGARAN"
+    print(f"\nimport + create_app: {startup_ms:.1f} ms (anggaran {args.budget_ms:.0f} ms) -> {verdict}")
+    if startup_ms > args.budget_ms:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/fakes.py
+"""
+Pengganti in-memory untuk GoogleSheetsClient dan TelegramBot, dengan latensi yang bisa diatur.
+Untuk Gemini dipakai FakeLLMBackend dari converters/llm_backend.py.
+"""
+import threading
+import time
+import pandas as pd
+
+from google_sheets import GoogleSheetsClient
+
+class FakeSheetsClient:
+    """Menyimpan grid setiap worksheet di memori. Setiap panggilan API ditunda `latency_seconds`."""
+    def __init__(self, worksheets=None, latency_seconds=0.0):
+        self.worksheets = {name: [list(row) for row in grid] for name, grid in (worksheets or {}).items()}
+        self.latency_seconds = latency_seconds
+        self.api_calls = 0
+        # Versi grid per worksheet, seperti versi snapshot di GoogleSheetsClient
+        self.versions = {}
+        self._version_counter = 0
+        self._lock = threading.Lock()
+
+    def _call_api(self):
+        with self._lock:
+            self.api_calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def get_all_data_as_df(self, worksheet_name):
+        self._call_api()
+        values = self.worksheets.get(worksheet_name)
+        df = pd.DataFrame(values[1:], columns=values[0]) if values else pd.DataFrame()
+        df.attrs['sheet_version'] = self._version(worksheet_name)
+        return df
+
+    def _version(self, worksheet_name, bump=False):
+        with self._lock:
+            if bump or worksheet_name not in self.versions:
+                self._version_counter += 1
+                self.versions[worksheet_name] = self._version_counter
+            return self.versions[worksheet_name]
+
+    def get_existing_epics(self, worksheet_name, epic_column_index=1):
+        self._call_api()
+        values = self.worksheets.get(worksheet_name) or [[]]
+        return sorted({row[epic_column_index - 1] for row in values[1:] if row[epic_column_index - 1]})
+
+    def append_rows_to_worksheet(self, worksheet_name, data_df: pd.DataFrame):
+        self._call_api()
+        grid = self.worksheets.setdefault(worksheet_name, [data_df.columns.values.tolist()])
+        grid.extend(data_df.fillna('').values.tolist())
+        self._version(worksheet_name, bump=True)
+        return len(data_df)
+
+    def sync_worksheet_with_df(self, worksheet_name, data_df: pd.DataFrame):
+        self._call_api()
+        new_grid = [[str(col) for col in data_df.columns]] + data_df.fillna('').astype(str).values.tolist()
+        # Statistik dihitung dengan diff yang sama seperti client asli
+        _, stats = GoogleSheetsClient._diff_grids(self.worksheets.get(worksheet_name, []), new_grid)
+        self.worksheets[worksheet_name] = new_grid
+        stats['rows'] = len(data_df)
+        stats['sheet_version'] = self._version(worksheet_name, bump=True)
+        return stats
+
+class FakeTelegramBot:
+    """Mencatat pesan yang dikirim alih-alih memanggil Bot API."""
+    def __init__(self, latency_seconds=0.0):
+        self.latency_seconds = latency_seconds
+        self.sent_messages = []
+
+    def set_webhook(self, url):
+        return {'ok': True}
+
+    def send_message(self, chat_id, text):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        self.sent_messages.append((chat_id, text))
+        return {'ok': True}
+
+    def send_message_async(self, chat_id, text):
+        # Seperti TelegramBot asli, pengirim tidak menunggu Telegram
+        self.sent_messages.append((chat_id, text))
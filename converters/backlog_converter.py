@@ -1,43 +1,39 @@
 # converters/backlog_converter.py
+import logging
 import pandas as pd
-import google.generativeai as genai
 import re
 import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from converters.date_parser import convert_mixed_language_date
+from converters.llm_backend import KeyPool, LLMError
+from metrics import REGISTRY
 
-def convert_mixed_language_date(date_str: str) -> str | None:
-    if not isinstance(date_str, str) or not date_str.strip():
-        return None
-    month_map = {
-        'januari': 'January', 'februari': 'February', 'maret': 'March',
-        'april': 'April', 'mei': 'May', 'juni': 'June',
-        'juli': 'July', 'agustus': 'August', 'september': 'September',
-        'oktober': 'October', 'november': 'November', 'desember': 'December'
-    }
-    try:
-        processed_str = date_str.lower()
-        for id_month, en_month in month_map.items():
-            processed_str = processed_str.replace(id_month, en_month)
-        return processed_str
-    except Exception:
-        return date_str
+logger = logging.getLogger(__name__)
 
 class BacklogProcessor:
-    def __init__(self, api_keys_string: str):
-        if not api_keys_string:
-            raise ValueError("String API Key tidak ditemukan.")
-        # --- PERUBAHAN UTAMA: Tangani daftar key ---
-        self.api_keys = [key.strip() for key in api_keys_string.split(',')]
-        self.current_key_index = 0
-        print(f"BacklogProcessor diinisialisasi dengan {len(self.api_keys)} API key.")
-
-    def _rotate_and_configure_api_key(self):
-        """Memilih key berikutnya dalam daftar dan mengonfigurasi API."""
-        # Pindah ke key berikutnya
-        self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
-        
-        current_key = self.api_keys[self.current_key_index]
-        print(f"Menggunakan API Key #{self.current_key_index + 1}...")
-        genai.configure(api_key=current_key)
+    def __init__(self, api_keys_string: str | None = None, batch_size: int = 20, max_workers: int | None = None,
+                 epic_cache=None, key_pool: KeyPool | None = None, epic_index=None,
+                 candidate_top_k: int = 5, auto_assign_threshold: float = 0.9):
+        if key_pool is None:
+            if not api_keys_string:
+                raise ValueError("String API Key tidak ditemukan.")
+            # --- PERUBAHAN UTAMA: Setiap key punya client sendiri di dalam KeyPool ---
+            key_pool = KeyPool.from_api_keys(api_keys_string)
+        self.key_pool = key_pool
+        self.batch_size = max(1, batch_size)
+        # Default: satu worker per API key agar setiap batch berjalan di key yang berbeda
+        self.max_workers = max(1, max_workers or len(self.key_pool))
+        self.epic_cache = epic_cache
+        # Jika ada epic_index, prompt hanya memuat kandidat Epic teratas per task
+        self.epic_index = epic_index
+        self.candidate_top_k = candidate_top_k
+        self.auto_assign_threshold = auto_assign_threshold
+        self._stats_lock = threading.Lock()
+        self.prompt_stats = {'llm_prompts': 0, 'prompt_chars': 0, 'prompt_chars_without_compaction': 0,
+                             'cache_hits': 0, 'auto_assigned': 0}
+        logger.info(f"BacklogProcessor diinisialisasi dengan {len(self.key_pool)} API key "
+              f"(batch {self.batch_size}, {self.max_workers} worker).")
 
     def _create_prompt(self, raw_backlog_text: str, existing_epics: list[str]) -> str:
         epics_list_str = ", ".join(f'"{epic}"' for epic in existing_epics)
@@ -56,8 +52,7 @@ class BacklogProcessor:
         4.  **Kolom Output**: Urutan kolom harus: Epic|Backlog|PIC|Status|Start Date|End Date
 
         FORMAT INPUT:
-        Setiap baris input dipisahkan oleh TAB: Backlog<TAB>Canonical Backlog<TAB>PIC<TAB>Status<TAB>Start Date<TAB>End Date.
-        Gunakan kolom 'Backlog' untuk memahami konteks, abaikan 'Canonical Backlog'.
+        Setiap baris input dipisahkan oleh TAB: Backlog<TAB>PIC<TAB>Status<TAB>Start Date<TAB>End Date.
 
         Berikut adalah backlog baru yang harus Anda proses:
         --- BACKLOG BARU ---
@@ -68,25 +63,57 @@ class BacklogProcessor:
         """
         return prompt
 
+    def _create_batch_prompt(self, numbered_tasks_text: str, existing_epics: list[str]) -> str:
+        epics_list_str = ", ".join(f'"{epic}"' for epic in existing_epics)
+        prompt = f"""
+        Anda adalah seorang Agile Project Manager yang sangat ahli dan konsisten.
+        Tugas Anda adalah menetapkan Epic untuk setiap backlog baru.
+
+        KONTEKS PENTING:
+        Berikut adalah daftar Epic yang SUDAH ADA di dalam spreadsheet:
+        [{epics_list_str}]
+
+        ATURAN UTAMA:
+        1.  **GUNAKAN KEMBALI EPIC YANG ADA**: Untuk setiap backlog, periksa apakah topiknya cocok dengan salah satu Epic yang sudah ada. Jika cocok, HARUS gunakan nama Epic yang persis sama.
+        2.  **BUAT EPIC BARU JIKA PERLU**: Hanya jika sebuah backlog memiliki topik yang benar-benar baru, Anda boleh membuat nama Epic baru.
+        3.  **Format Output**: Satu baris per backlog dengan format No|Epic, tanpa header dan tanpa teks pembuka/penutup.
+        4.  **Nomor**: Kolom No HARUS sama persis dengan nomor backlog pada input.
+
+        FORMAT INPUT:
+        Setiap baris input dipisahkan oleh TAB: No<TAB>PIC<TAB>Backlog.
+
+        Berikut adalah backlog baru yang harus Anda proses:
+        --- BACKLOG BARU ---
+        {numbered_tasks_text}
+        --- AKHIR BACKLOG BARU ---
+
+        Sekarang, tetapkan Epic untuk setiap backlog di atas dan hasilkan output dalam format No|Epic.
+        """
+        return prompt
+
+    def _record_prompt(self, prompt: str, epics_used: list[str], all_epics: list[str]):
+        """Mencatat ukuran prompt dibanding jika seluruh daftar Epic ikut dikirim."""
+        used_chars = len(", ".join(f'"{epic}"' for epic in epics_used))
+        all_chars = len(", ".join(f'"{epic}"' for epic in all_epics))
+        with self._stats_lock:
+            self.prompt_stats['llm_prompts'] += 1
+            self.prompt_stats['prompt_chars'] += len(prompt)
+            self.prompt_stats['prompt_chars_without_compaction'] += len(prompt) - used_chars + all_chars
+        REGISTRY.inc('backlog_bot_llm_prompt_chars_total', len(prompt))
+
     def _call_llm(self, prompt: str) -> str:
-        # --- PERUBAHAN UTAMA: Lakukan rotasi sebelum setiap panggilan ---
-        self._rotate_and_configure_api_key()
-        
-        print("Mengirim permintaan ke Google Gemini...")
+        logger.info("Mengirim permintaan ke Google Gemini...")
         try:
-            model = genai.GenerativeModel('gemini-2.5-flash') 
-            generation_config = {"temperature": 0.1}
-            safety_settings = {'HATE': 'block_none', 'HARASSMENT': 'block_none', 'SEXUAL' : 'block_none', 'DANGEROUS' : 'block_none'}
-            response = model.generate_content(prompt, generation_config=generation_config, safety_settings=safety_settings)
-            print("Respons dari Gemini diterima.")
-            return response.text.strip()
-        except Exception as e:
-            print(f"Terjadi error saat menghubungi API Gemini: {e}")
+            response_text = self.key_pool.generate(prompt)
+            logger.info("Respons dari Gemini diterima.")
+            return response_text
+        except LLMError as e:
+            logger.error(f"Terjadi error saat menghubungi API Gemini: {e}")
             return ""
 
     def _parse_llm_response_to_df(self, llm_response: str) -> pd.DataFrame:
         if not llm_response:
-            print("Respons LLM kosong.")
+            logger.warning("Respons LLM kosong.")
             return pd.DataFrame()
         cleaned_response = re.sub(r'```(csv)?', '', llm_response)
         lines = cleaned_response.strip().split('\n')
@@ -95,7 +122,7 @@ class BacklogProcessor:
         num_separators = len(expected_columns) - 1
         data_lines = [line.strip() for line in lines if line.count('|') == num_separators]
         if not data_lines:
-            print("Tidak ada baris data valid yang ditemukan dalam respons LLM.")
+            logger.warning("Tidak ada baris data valid yang ditemukan dalam respons LLM.")
             return pd.DataFrame()
         csv_data_to_parse = "\n".join(data_lines)
         data = io.StringIO(csv_data_to_parse)
@@ -104,15 +131,154 @@ class BacklogProcessor:
             for col in df.columns:
                 if df[col].dtype == 'object':
                     df[col] = df[col].astype(str).str.strip()
-            print("Respons LLM berhasil diurai menjadi tabel.")
+            logger.info("Respons LLM berhasil diurai menjadi tabel.")
             return df
         except Exception as e:
-            print(f"Gagal mengurai respons LLM. Error: {e}")
+            logger.warning(f"Gagal mengurai respons LLM. Error: {e}")
             return pd.DataFrame()
 
-    def get_epics_for_new_tasks(self, intermediate_df: pd.DataFrame, existing_epics: list[str]) -> pd.DataFrame | None:
-        raw_text = intermediate_df.to_csv(sep='\t', index=False, header=True)
+    def _parse_batch_response(self, llm_response: str) -> dict[int, str]:
+        """Mengurai respons 'No|Epic' menjadi dict nomor -> Epic. Baris rusak diabaikan."""
+        epics_by_number = {}
+        if not llm_response:
+            return epics_by_number
+        cleaned_response = re.sub(r'```(csv)?', '', llm_response)
+        for line in cleaned_response.strip().split('\n'):
+            match = re.match(r'^\s*(\d+)\s*\|\s*(.+?)\s*$', line)
+            if match and '|' not in match.group(2):
+                epics_by_number[int(match.group(1))] = match.group(2)
+        return epics_by_number
+
+    def _classify_batch(self, batch_df: pd.DataFrame, existing_epics: list[str]) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Mengirim satu batch ke LLM. Mengembalikan (task yang berhasil, task yang harus diulang)."""
+        numbered_lines = [
+            f"{number}\t{pic}\t{backlog}"
+            for number, pic, backlog in zip(range(1, len(batch_df) + 1), batch_df['PIC'], batch_df['Backlog'])
+        ]
+        candidate_epics = existing_epics
+        if 'Candidate Epics' in batch_df.columns:
+            candidate_epics = list(dict.fromkeys(epic for candidates in batch_df['Candidate Epics'] for epic in candidates))
+            # Tanpa kandidat sama sekali (tidak ada kemiripan), kirim daftar Epic lengkap
+            candidate_epics = candidate_epics or existing_epics
+        prompt = self._create_batch_prompt("\n".join(numbered_lines), candidate_epics)
+        self._record_prompt(prompt, candidate_epics, existing_epics)
+        epics_by_number = self._parse_batch_response(self._call_llm(prompt))
+
+        epics = pd.Series([epics_by_number.get(number) for number in range(1, len(batch_df) + 1)], index=batch_df.index)
+        resolved_df = batch_df[epics.notna()].copy()
+        resolved_df.insert(0, 'Epic', epics[epics.notna()])
+        failed_df = batch_df[epics.isna()]
+        if not failed_df.empty:
+            logger.warning(f"{len(failed_df)} dari {len(batch_df)} task dalam batch tidak valid dan akan diulang satu per satu.")
+        return resolved_df, failed_df
+
+    def get_epics_for_tasks_batched(self, intermediate_df: pd.DataFrame, existing_epics: list[str]) -> pd.DataFrame | None:
+        """
+        Menetapkan Epic untuk banyak task sekaligus. Task dikemas per `batch_size` ke dalam satu prompt
+        dan batch dijalankan paralel. Task yang hilang/rusak di respons LLM diulang satu per satu.
+        """
+        if intermediate_df.empty:
+            return None
+        tasks_df = intermediate_df.reset_index(drop=True)
+
+        resolved_parts = []
+        if self.epic_cache is not None:
+            keys = list(zip(tasks_df['PIC'].astype(str), tasks_df['Canonical Backlog']))
+            cached_epics = self.epic_cache.get_many(keys)
+            epics = pd.Series([cached_epics.get(key) for key in keys], index=tasks_df.index)
+            if epics.notna().any():
+                cached_df = tasks_df[epics.notna()].copy()
+                cached_df.insert(0, 'Epic', epics[epics.notna()])
+                resolved_parts.append(cached_df)
+                logger.info(f"{len(cached_df)} dari {len(tasks_df)} task diambil dari epic cache.")
+            with self._stats_lock:
+                self.prompt_stats['cache_hits'] += int(epics.notna().sum())
+            REGISTRY.inc('backlog_bot_epic_cache_hits_total', int(epics.notna().sum()))
+            tasks_df = tasks_df[epics.isna()].reset_index(drop=True)
+
+        if self.epic_index is not None and len(self.epic_index) and not tasks_df.empty:
+            rankings = [self.epic_index.rank(text, self.candidate_top_k) for text in tasks_df['Canonical Backlog']]
+            # Backlog yang hampir identik dengan backlog lama langsung memakai Epic-nya tanpa LLM
+            auto_epics = pd.Series(
+                [ranking[0][0] if ranking and ranking[0][1] >= self.auto_assign_threshold else None for ranking in rankings],
+                index=tasks_df.index
+            )
+            tasks_df['Candidate Epics'] = [[epic for epic, _ in ranking] for ranking in rankings]
+            if auto_epics.notna().any():
+                auto_df = tasks_df[auto_epics.notna()].copy()
+                auto_df.insert(0, 'Epic', auto_epics[auto_epics.notna()])
+                resolved_parts.append(auto_df)
+                logger.info(f"{len(auto_df)} task langsung diberi Epic dari backlog serupa (tanpa LLM).")
+            with self._stats_lock:
+                self.prompt_stats['auto_assigned'] += int(auto_epics.notna().sum())
+            REGISTRY.inc('backlog_bot_epic_auto_assigned_total', int(auto_epics.notna().sum()))
+            tasks_df = tasks_df[auto_epics.isna()].reset_index(drop=True)
+
+        batches = [tasks_df.iloc[start:start + self.batch_size] for start in range(0, len(tasks_df), self.batch_size)]
+        if batches:
+            logger.info(f"Memproses {len(tasks_df)} task dalam {len(batches)} batch...")
+
+        def retry_single(row):
+            candidates = row.get('Candidate Epics')
+            single_df = pd.DataFrame([row.drop(labels=['Candidate Epics'], errors='ignore')])
+            retried = self.get_epics_for_new_tasks(single_df, candidates or existing_epics, all_epics=existing_epics)
+            if retried is None or retried.empty or not str(retried['Epic'].iloc[0]).strip():
+                return None
+            # Hanya Epic yang diambil dari respons; PIC, Backlog, dan tanggal tetap dari baris asli
+            # seperti di _classify_batch, agar echo LLM yang rusak tidak mengubah data atau kunci cache
+            single_df.insert(0, 'Epic', [str(retried['Epic'].iloc[0]).strip()])
+            return single_df
+
+        llm_parts = []
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                batch_results = list(executor.map(lambda batch: self._classify_batch(batch, existing_epics), batches))
+
+                llm_parts = [resolved for resolved, _ in batch_results if not resolved.empty]
+                failed_rows = [row for _, failed in batch_results for _, row in failed.iterrows()]
+                retry_results = list(executor.map(retry_single, failed_rows))
+
+            for row, retried in zip(failed_rows, retry_results):
+                if retried is not None and not retried.empty:
+                    llm_parts.append(retried)
+                else:
+                    logger.warning(f"Gagal memproses task tunggal '{row['Backlog'][:50]}'. Melanjutkan...")
+
+        if llm_parts:
+            llm_df = pd.concat(llm_parts, ignore_index=True)
+            if self.epic_cache is not None:
+                self.epic_cache.set_many(list(zip(llm_df['PIC'].astype(str), llm_df['Canonical Backlog'], llm_df['Epic'])))
+            if self.epic_index is not None:
+                for canonical, epic in zip(llm_df['Canonical Backlog'], llm_df['Epic']):
+                    self.epic_index.add(canonical, epic)
+
+        with self._stats_lock:
+            stats = dict(self.prompt_stats)
+        if stats['prompt_chars_without_compaction']:
+            saved = 1 - stats['prompt_chars'] / stats['prompt_chars_without_compaction']
+            logger.info(f"Ukuran prompt kumulatif: {stats['prompt_chars']} karakter "
+                  f"(tanpa kompaksi {stats['prompt_chars_without_compaction']}, hemat {saved:.0%}).")
+
+        resolved_parts.extend(llm_parts)
+        if not resolved_parts:
+            return None
+
+        result_df = pd.concat(resolved_parts, ignore_index=True)
+        result_df = result_df[['Epic', 'Backlog', 'PIC', 'Status', 'Start Date', 'End Date', 'Canonical Backlog']]
+        result_df['Start Date'] = result_df['Start Date'].apply(convert_mixed_language_date)
+        result_df['End Date'] = result_df['End Date'].apply(convert_mixed_language_date)
+        return result_df
+
+    def get_epics_for_new_tasks(self, intermediate_df: pd.DataFrame, existing_epics: list[str],
+                                all_epics: list[str] | None = None) -> pd.DataFrame | None:
+        """
+        `existing_epics` adalah daftar Epic yang dikirim di prompt; `all_epics` (default: sama) adalah
+        daftar lengkap, dipakai sebagai pembanding ukuran prompt tanpa kompaksi kandidat.
+        """
+        # 'Canonical Backlog' tidak dikirim ke LLM; kolom itu digabungkan kembali setelah respons diurai
+        raw_text = intermediate_df.drop(columns=['Canonical Backlog']).to_csv(sep='\t', index=False, header=True)
         prompt = self._create_prompt(raw_text, existing_epics)
+        self._record_prompt(prompt, existing_epics, existing_epics if all_epics is None else all_epics)
         llm_result = self._call_llm(prompt)
         if not llm_result: return None
         
@@ -122,7 +288,7 @@ class BacklogProcessor:
         if len(structured_data) == len(intermediate_df):
             structured_data['Canonical Backlog'] = intermediate_df['Canonical Backlog'].values
         else:
-            print("Peringatan: Jumlah baris dari LLM tidak cocok dengan input. 'Canonical Backlog' tidak dapat digabungkan kembali.")
+            logger.warning("Jumlah baris dari LLM tidak cocok dengan input. 'Canonical Backlog' tidak dapat digabungkan kembali.")
             return None
         
         if 'Start Date' in structured_data.columns:
@@ -0,0 +1,88 @@
+# converters/date_parser.py
+import re
+import threading
+from functools import lru_cache
+import pandas as pd
+
+# Format tanggal yang ditulis ke Google Sheets, misalnya '11 September 2025'
+SHEET_DATE_FORMAT = '%d %B %Y'
+
+# Nama bulan Indonesia & Inggris (lengkap dan singkatan) -> nomor bulan
+MONTH_NUMBERS = {
+    'januari': 1, 'january': 1, 'jan': 1,
+    'februari': 2, 'february': 2, 'feb': 2,
+    'maret': 3, 'march': 3, 'mar': 3,
+    'april': 4, 'apr': 4,
+    'mei': 5, 'may': 5,
+    'juni': 6, 'june': 6, 'jun': 6,
+    'juli': 7, 'july': 7, 'jul': 7,
+    'agustus': 8, 'august': 8, 'agu': 8, 'agt': 8, 'aug': 8,
+    'september': 9, 'sept': 9, 'sep': 9,
+    'oktober': 10, 'october': 10, 'okt': 10, 'oct': 10,
+    'november': 11, 'nov': 11,
+    'desember': 12, 'december': 12, 'des': 12, 'dec': 12,
+}
+
+ID_TO_EN_MONTHS = {
+    'januari': 'January', 'februari': 'February', 'maret': 'March',
+    'april': 'April', 'mei': 'May', 'juni': 'June',
+    'juli': 'July', 'agustus': 'August', 'september': 'September',
+    'oktober': 'October', 'november': 'November', 'desember': 'December'
+}
+
+# "11 September 2025", "11 - September - 2025", "11-Sep-2025", "11/okt/2025"
+DATE_PATTERN = re.compile(r'^\s*(\d{1,2})[\s\-/]+([a-zA-Z]+)\.?[\s\-/]+(\d{4})\s*$')
+_ID_MONTH_PATTERN = re.compile('|'.join(ID_TO_EN_MONTHS))
+
+# Sheet hanya berisi beberapa ratus tanggal unik, jadi hasil parsing disimpan lintas pemanggilan
+_PARSED_CACHE_LIMIT = 50000
+_parsed_cache = {}
+# Pipeline beberapa route berjalan paralel, jadi cache bersama hanya diakses dengan lock
+_parsed_cache_lock = threading.Lock()
+
+@lru_cache(maxsize=4096)
+def convert_mixed_language_date(date_str: str) -> str | None:
+    """Mengganti nama bulan Indonesia dengan nama bulan Inggris, misalnya '11 september 2025' -> '11 September 2025'."""
+    if not isinstance(date_str, str) or not date_str.strip():
+        return None
+    return _ID_MONTH_PATTERN.sub(lambda match: ID_TO_EN_MONTHS[match.group(0)], date_str.lower())
+
+def _parse_unique_values(values: list) -> list:
+    """Mem-parsing nilai unik: format 'hari bulan tahun' secara vektor, sisanya lewat pd.to_datetime."""
+    as_text = pd.Series(values, dtype=object).where(lambda s: s.map(lambda v: isinstance(v, str)))
+    parts = as_text.str.extract(DATE_PATTERN)
+    months = parts[1].str.lower().map(MONTH_NUMBERS)
+    iso_strings = parts[2] + '-' + months.astype('Int64').astype(str).str.zfill(2) + '-' + parts[0].str.zfill(2)
+    parsed = pd.to_datetime(iso_strings.where(months.notna()), format='%Y-%m-%d', errors='coerce')
+
+    results = []
+    for value, matched, timestamp in zip(values, months.notna(), parsed):
+        if matched:
+            results.append(timestamp)
+        elif isinstance(value, str) and not value.strip():
+            results.append(pd.NaT)
+        else:
+            # Nilai yang sudah berupa tanggal atau format lain (misalnya tampilan lokal Sheets)
+            results.append(pd.to_datetime(value, errors='coerce'))
+    return results
+
+def parse_mixed_language_dates(values: pd.Series) -> pd.Series:
+    """
+    Mengubah kolom tanggal campuran (bulan Indonesia/Inggris, string kosong, objek tanggal)
+    menjadi Series datetime. Setiap nilai unik hanya di-parsing sekali.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    uniques = list(uniques)
+    # Salinan lokal: thread lain boleh mengosongkan cache tanpa membuat lookup di bawah gagal
+    with _parsed_cache_lock:
+        parsed = {value: _parsed_cache[value] for value in uniques if value in _parsed_cache}
+    missing = [value for value in uniques if value not in parsed]
+    if missing:
+        newly_parsed = dict(zip(missing, _parse_unique_values(missing)))
+        parsed.update(newly_parsed)
+        with _parsed_cache_lock:
+            if len(_parsed_cache) + len(newly_parsed) > _PARSED_CACHE_LIMIT:
+                _parsed_cache.clear()
+            _parsed_cache.update(newly_parsed)
+    parsed_uniques = pd.DatetimeIndex([parsed[value] for value in uniques], dtype='datetime64[ns]')
+    return pd.Series(parsed_uniques.take(codes, allow_fill=True, fill_value=pd.NaT), index=values.index, name=values.name)
@@ -0,0 +1,168 @@
+# converters/epic_index.py
+import logging
+import math
+import threading
+from collections import Counter, defaultdict
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+class EpicIndex:
+    """
+    Index TF-IDF n-gram karakter atas backlog yang sudah punya Epic (dan nama Epic itu sendiri).
+    Dipakai untuk memilih beberapa kandidat Epic per task sebelum memanggil LLM, atau langsung
+    menetapkan Epic jika ada backlog lama yang hampir identik.
+
+    Index diperbarui secara inkremental: IDF dibekukan di antara pembangunan ulang berkala, sehingga
+    panjang vektor dokumen baru dihitung saat ditambahkan tanpa menyentuh dokumen lain. Pembangunan
+    ulang penuh baru dilakukan setelah `rebuild_fraction` dari isi index berubah. N-gram yang muncul
+    di lebih dari `max_df_ratio` dokumen diberi bobot 0 (hampir tidak membedakan Epic, tetapi daftar
+    posting-nya paling panjang), dan dokumen tertua dibuang jika jumlahnya melebihi `max_documents`.
+    """
+    # N-gram baru dianggap terlalu umum jika muncul di lebih dari ini, berapa pun ukuran index
+    MIN_COMMON_DF = 50
+
+    def __init__(self, ngram_size: int = 3, max_documents: int = 20000, max_df_ratio: float = 0.05,
+                 rebuild_fraction: float = 0.25):
+        self.ngram_size = ngram_size
+        self.max_documents = max_documents
+        self.max_df_ratio = max_df_ratio
+        self.rebuild_fraction = rebuild_fraction
+        self._lock = threading.Lock()
+        self._docs = {}                      # kunci dokumen -> (epic, Counter n-gram), urut dari yang tertua
+        self._postings = defaultdict(dict)   # n-gram -> {kunci dokumen: bobot tf (1 + log frekuensi)}
+        self._norms = {}
+        self._idfs = {}                      # IDF beku sejak pembangunan ulang terakhir; 0 = n-gram terlalu umum
+        self._unseen_idf = 1.0               # IDF untuk n-gram yang belum ada saat pembangunan ulang terakhir
+        self._changes_since_rebuild = 0
+        # Kunci dokumen -> Epic yang sudah pernah ditangani, termasuk dokumen yang sudah dibuang,
+        # agar baris sheet lama tidak dimasukkan ulang (dan membuang dokumen lain) di setiap pesan
+        self._known = {}
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _ngrams(self, text: str) -> Counter:
+        padded = f" {text.lower().strip()} "
+        return Counter(padded[i:i + self.ngram_size] for i in range(max(1, len(padded) - self.ngram_size + 1)))
+
+    def _weight(self, ngram: str) -> float:
+        return self._idfs.get(ngram, self._unseen_idf)
+
+    def _remove_document(self, doc_key):
+        _, ngrams = self._docs.pop(doc_key)
+        for ngram in ngrams:
+            docs = self._postings[ngram]
+            del docs[doc_key]
+            if not docs:
+                del self._postings[ngram]
+        del self._norms[doc_key]
+
+    def _add_document(self, doc_key, epic: str, text: str):
+        if self._known.get(doc_key) == epic:
+            return
+        self._known[doc_key] = epic
+        if doc_key in self._docs:
+            self._remove_document(doc_key)
+        ngrams = self._ngrams(text)
+        self._docs[doc_key] = (epic, ngrams)
+        norm = 0.0
+        for ngram, count in ngrams.items():
+            tf_weight = 1 + math.log(count)
+            self._postings[ngram][doc_key] = tf_weight
+            norm += (tf_weight * self._weight(ngram)) ** 2
+        self._norms[doc_key] = math.sqrt(norm)
+        self._changes_since_rebuild += 1
+        while len(self._docs) > self.max_documents:
+            self._remove_document(next(iter(self._docs)))
+
+    def _add(self, canonical_text: str, epic: str):
+        if not canonical_text or not epic:
+            return
+        self._add_document(('epic', epic), epic, epic)
+        self._add_document(('backlog', canonical_text), epic, canonical_text)
+
+    def add(self, canonical_text: str, epic: str):
+        """Menambahkan (atau memperbarui) satu backlog kanonis beserta Epic-nya."""
+        with self._lock:
+            self._add(canonical_text, epic)
+            self._maybe_rebuild()
+
+    def update_from_df(self, data_df: pd.DataFrame):
+        """Memasukkan baris sheet yang punya Epic. Baris yang sudah pernah ditangani dilewati."""
+        if data_df.empty or not {'Canonical Backlog', 'Epic'}.issubset(data_df.columns):
+            return
+        rows = list(zip(data_df['Canonical Backlog'].tolist(), data_df['Epic'].astype(str).str.strip().tolist()))
+        # Baris awal di luar kapasitas akan langsung dibuang lagi, jadi hanya dicatat sebagai sudah ditangani
+        overflow = max(0, len(rows) - self.max_documents)
+        with self._lock:
+            changes_before = self._changes_since_rebuild
+            for canonical, epic in rows[:overflow]:
+                doc_key = ('backlog', canonical)
+                if doc_key in self._docs:
+                    self._add(canonical, epic)
+                elif canonical and epic:
+                    self._known[doc_key] = epic
+                    self._add_document(('epic', epic), epic, epic)  # Nama Epic tetap terindeks
+            for canonical, epic in rows[overflow:]:
+                self._add(canonical, epic)
+            changed = self._changes_since_rebuild != changes_before
+            self._maybe_rebuild()
+        if changed:
+            logger.info(f"Epic index diperbarui: {len(self._docs)} dokumen.")
+
+    def _maybe_rebuild(self):
+        if self._changes_since_rebuild > self.rebuild_fraction * len(self._docs):
+            self._rebuild()
+
+    def _rebuild(self):
+        """Menghitung ulang IDF dan panjang vektor semua dokumen; biayanya sebanding ukuran index."""
+        num_docs = len(self._docs)
+        common_df = max(self.max_df_ratio * num_docs, self.MIN_COMMON_DF)
+        self._idfs = {
+            ngram: 0.0 if len(docs) > common_df else math.log((1 + num_docs) / (1 + len(docs))) + 1
+            for ngram, docs in self._postings.items()
+        }
+        self._unseen_idf = math.log(1 + num_docs) + 1
+        norms = defaultdict(float)
+        for ngram, docs in self._postings.items():
+            idf = self._idfs[ngram]
+            if not idf:
+                continue
+            for doc_key, tf_weight in docs.items():
+                norms[doc_key] += (tf_weight * idf) ** 2
+        self._norms = {doc_key: math.sqrt(norms.get(doc_key, 0.0)) for doc_key in self._docs}
+        self._changes_since_rebuild = 0
+        logger.debug(f"Epic index dibangun ulang: {num_docs} dokumen, "
+                     f"{sum(1 for idf in self._idfs.values() if not idf)} n-gram umum diabaikan.")
+
+    def rank(self, text: str, top_k: int = 5) -> list[tuple[str, float]]:
+        """Mengembalikan hingga `top_k` (epic, skor kosinus) terurut dari yang paling mirip."""
+        with self._lock:
+            if not self._docs:
+                return []
+            query_weights = {}
+            for ngram, count in self._ngrams(text).items():
+                weight = self._weight(ngram)
+                if weight:
+                    query_weights[ngram] = (1 + math.log(count)) * weight
+            query_norm = math.sqrt(sum(weight ** 2 for weight in query_weights.values()))
+            if not query_norm:
+                return []
+
+            dot_products = defaultdict(float)
+            for ngram, query_weight in query_weights.items():
+                docs = self._postings.get(ngram)
+                if not docs:
+                    continue
+                scale = query_weight * self._weight(ngram)
+                for doc_key, tf_weight in docs.items():
+                    dot_products[doc_key] += scale * tf_weight
+
+            best_by_epic = {}
+            for doc_key, dot_product in dot_products.items():
+                epic = self._docs[doc_key][0]
+                score = dot_product / (query_norm * self._norms[doc_key])
+                if score > best_by_epic.get(epic, 0.0):
+                    best_by_epic[epic] = score
+        return sorted(best_by_epic.items(), key=lambda item: item[1], reverse=True)[:top_k]
@@ -0,0 +1,233 @@
+# converters/llm_backend.py
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import NamedTuple
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+class LLMResponse(NamedTuple):
+    text: str
+    tokens: int
+
+class LLMError(Exception):
+    """Kegagalan memanggil LLM (key tidak valid, error jaringan, respons diblokir, dsb.)."""
+
+class RateLimitError(LLMError):
+    """LLM menolak karena kuota/rate limit key habis (HTTP 429)."""
+
+class GeminiBackend:
+    """Memanggil Gemini dengan client milik satu API key, tanpa genai.configure yang bersifat global."""
+    def __init__(self, api_key: str, model_name: str = 'gemini-2.5-flash'):
+        import google.generativeai as genai
+        from google.ai import generativelanguage as glm
+        from google.api_core import exceptions as google_exceptions
+
+        self._genai = genai
+        self._google_exceptions = google_exceptions
+        self._client = glm.GenerativeServiceClient(client_options={'api_key': api_key})
+        self.model_name = model_name
+        self.name = f"...{api_key[-4:]}"
+
+    def generate(self, prompt: str) -> LLMResponse:
+        model = self._genai.GenerativeModel(self.model_name)
+        # GenerativeModel memakai client default global jika _client kosong; isi dengan client key ini
+        model._client = self._client
+        generation_config = {"temperature": 0.1}
+        safety_settings = {'HATE': 'block_none', 'HARASSMENT': 'block_none', 'SEXUAL' : 'block_none', 'DANGEROUS' : 'block_none'}
+        try:
+            response = model.generate_content(prompt, generation_config=generation_config, safety_settings=safety_settings)
+            text = response.text.strip()
+        except self._google_exceptions.ResourceExhausted as e:
+            raise RateLimitError(str(e)) from e
+        except Exception as e:
+            raise LLMError(str(e)) from e
+        usage = getattr(response, 'usage_metadata', None)
+        tokens = getattr(usage, 'total_token_count', 0) or (len(prompt) + len(text)) // 4
+        return LLMResponse(text, tokens)
+
+class FakeLLMBackend:
+    """
+    Backend palsu untuk pengujian dan benchmark offline. Menjawab prompt batch ('No|Epic')
+    dan prompt satu-per-satu (CSV pipa) secara deterministik, dengan latensi dan kegagalan yang bisa diatur.
+    """
+    def __init__(self, name='fake', latency_seconds=0.0, failure_rate=0.0, rate_limit_rate=0.0, responder=None, seed=None):
+        self.name = name
+        self.latency_seconds = latency_seconds
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.responder = responder or self.default_responder
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def default_responder(prompt: str) -> str:
+        match = re.search(r'--- BACKLOG BARU ---\n(.*?)\n\s*--- AKHIR BACKLOG BARU ---', prompt, re.S)
+        rows = [line.strip(' ').split('\t') for line in match.group(1).strip(' \n').split('\n')] if match else []
+        if 'No|Epic' in prompt:
+            # Baris batch: No<TAB>PIC<TAB>Backlog -> Epic dari kata pertama backlog
+            return "\n".join(f"{row[0]}|Epic {row[2].split()[0].title()}" for row in rows if len(row) >= 3)
+        # Baris tunggal (dengan header): Backlog<TAB>PIC<TAB>Status<TAB>Start Date<TAB>End Date
+        return "\n".join(
+            f"Epic {row[0].split()[0].title()}|{row[0]}|{row[1]}|{row[2]}|{row[3]}|{row[4]}"
+            for row in rows[1:] if len(row) >= 5
+        )
+
+    def generate(self, prompt: str) -> LLMResponse:
+        with self._lock:
+            self.calls += 1
+            roll = self._random.random()
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        if roll < self.rate_limit_rate:
+            raise RateLimitError(f"{self.name}: 429 kuota habis (palsu)")
+        if roll < self.rate_limit_rate + self.failure_rate:
+            raise LLMError(f"{self.name}: error palsu")
+        text = self.responder(prompt)
+        return LLMResponse(text, (len(prompt) + len(text)) // 4)
+
+class KeyPool:
+    """
+    Penjadwal beberapa API key. Setiap request dikirim ke key dengan sisa kuota (request & token per menit)
+    terbesar, dipindahkan ke key lain jika gagal, dan key yang terus gagal diputus sementara (circuit breaker).
+    Setelah cooldown, circuit setengah terbuka: tepat satu request percobaan dikirim ke key itu; berhasil
+    berarti key pulih, gagal berarti diputus lagi dengan cooldown yang lebih lama.
+    """
+    WINDOW_SECONDS = 60
+    # Pengurang skor per kegagalan beruntun, agar key yang sedang gagal tidak menang saat kuota seimbang
+    FAILURE_PENALTY = 0.25
+
+    def __init__(self, backends: list, requests_per_minute=10, tokens_per_minute=250000,
+                 failure_threshold=3, cooldown_seconds=60):
+        if not backends:
+            raise ValueError("KeyPool membutuhkan minimal satu backend.")
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._lock = threading.Lock()
+        self._keys = [{
+            'backend': backend,
+            'usage': deque(),        # (waktu, token) dalam jendela satu menit terakhir
+            'rate_limited_at': deque(),
+            'latency_ewma': None,
+            'consecutive_failures': 0,
+            'open_until': 0.0,
+            'probing': False,        # Request percobaan circuit setengah terbuka sedang berjalan
+            'requests': 0, 'tokens': 0, 'failures': 0, 'rate_limited': 0, 'circuit_opens': 0,
+        } for backend in backends]
+
+    def __len__(self):
+        return len(self._keys)
+
+    @classmethod
+    def from_api_keys(cls, api_keys_string: str, **kwargs):
+        api_keys = [key.strip() for key in api_keys_string.split(',') if key.strip()]
+        return cls([GeminiBackend(key) for key in api_keys], **kwargs)
+
+    def _headroom(self, key, now) -> float:
+        while key['usage'] and now - key['usage'][0][0] > self.WINDOW_SECONDS:
+            key['usage'].popleft()
+        while key['rate_limited_at'] and now - key['rate_limited_at'][0] > self.WINDOW_SECONDS:
+            key['rate_limited_at'].popleft()
+        used_tokens = sum(tokens for _, tokens in key['usage'])
+        headroom = min(1 - len(key['usage']) / self.requests_per_minute, 1 - used_tokens / self.tokens_per_minute)
+        # Key yang baru saja kena 429 diturunkan prioritasnya
+        return headroom - 0.5 * len(key['rate_limited_at'])
+
+    def _acquire(self, estimated_tokens, exclude):
+        """Memilih key terbaik dan langsung mencatat pemakaiannya agar thread lain melihat kuota yang tersisa."""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [key for key in self._keys
+                          if key['open_until'] <= now and not key['probing'] and id(key) not in exclude]
+            if not candidates:
+                return None
+            half_open = [key for key in candidates if key['consecutive_failures'] >= self.failure_threshold]
+            if half_open:
+                best = half_open[0]
+                best['probing'] = True
+            else:
+                # Key yang belum punya data latensi dianggap tercepat agar ikut dicoba; kegagalan beruntun
+                # (termasuk selain 429) menurunkan skor sehingga key yang rusak tidak dipilih lebih dulu
+                best = max(candidates, key=lambda key: (
+                    self._headroom(key, now) - self.FAILURE_PENALTY * key['consecutive_failures'],
+                    -(key['latency_ewma'] or 0),
+                ))
+            usage_entry = [now, estimated_tokens]
+            best['usage'].append(usage_entry)
+            best['requests'] += 1
+            return best, usage_entry
+
+    def generate(self, prompt: str) -> str:
+        """Mengirim prompt ke key terbaik, mencoba key lain jika gagal. Melempar LLMError jika semua gagal."""
+        tried = set()
+        last_error = None
+        while True:
+            acquired = self._acquire(len(prompt) // 4, tried)
+            if acquired is None:
+                break
+            key, usage_entry = acquired
+            tried.add(id(key))
+            started = time.monotonic()
+            try:
+                response = key['backend'].generate(prompt)
+            except LLMError as e:
+                last_error = e
+                self._record_failure(key, e, time.monotonic() - started)
+                continue
+            self._record_success(key, usage_entry, response.tokens, time.monotonic() - started)
+            return response.text
+        raise last_error or LLMError("Semua API key sedang diputus sementara (circuit breaker).")
+
+    def _record_success(self, key, usage_entry, tokens, latency):
+        with self._lock:
+            usage_entry[1] = tokens
+            key['tokens'] += tokens
+            if key['probing']:
+                logger.info(f"API key {key['backend'].name} pulih setelah request percobaan.")
+            key['probing'] = False
+            key['consecutive_failures'] = 0
+            key['latency_ewma'] = latency if key['latency_ewma'] is None else 0.8 * key['latency_ewma'] + 0.2 * latency
+        REGISTRY.inc('backlog_bot_llm_calls_total', key=key['backend'].name, result='ok')
+        REGISTRY.inc('backlog_bot_llm_tokens_total', tokens, key=key['backend'].name)
+        REGISTRY.observe('backlog_bot_llm_call_duration_seconds', latency, key=key['backend'].name)
+
+    def _record_failure(self, key, error, latency):
+        with self._lock:
+            key['failures'] += 1
+            key['consecutive_failures'] += 1
+            key['probing'] = False
+            if isinstance(error, RateLimitError):
+                key['rate_limited'] += 1
+                key['rate_limited_at'].append(time.monotonic())
+            if key['consecutive_failures'] >= self.failure_threshold:
+                # Cooldown berlipat setiap kali key gagal lagi setelah circuit dibuka
+                multiplier = 2 ** min(key['consecutive_failures'] - self.failure_threshold, 5)
+                key['open_until'] = time.monotonic() + self.cooldown_seconds * multiplier
+                key['circuit_opens'] += 1
+                logger.warning(f"API key {key['backend'].name} diputus sementara setelah {key['consecutive_failures']} kegagalan beruntun.")
+        logger.warning(f"API key {key['backend'].name} gagal: {error}")
+        result = 'rate_limited' if isinstance(error, RateLimitError) else 'error'
+        REGISTRY.inc('backlog_bot_llm_calls_total', key=key['backend'].name, result=result)
+        REGISTRY.observe('backlog_bot_llm_call_duration_seconds', latency, key=key['backend'].name)
+
+    def get_stats(self) -> list[dict]:
+        with self._lock:
+            now = time.monotonic()
+            return [{
+                'key': key['backend'].name,
+                'requests': key['requests'],
+                'tokens': key['tokens'],
+                'failures': key['failures'],
+                'rate_limited': key['rate_limited'],
+                'circuit_opens': key['circuit_opens'],
+                'circuit_open': key['open_until'] > now,
+                'avg_latency_seconds': key['latency_ewma'] or 0.0,
+                'headroom': self._headroom(key, now),
+            } for key in self._keys]
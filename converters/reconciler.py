@@ -0,0 +1,47 @@
+# converters/reconciler.py
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+
+class Changeset(NamedTuple):
+    """Hasil rekonsiliasi laporan baru terhadap task InProgress yang ada."""
+    completed: pd.DataFrame  # Tidak dilaporkan lagi -> Done, End Date diisi
+    ongoing: pd.DataFrame    # Masih dilaporkan -> baris lama dipertahankan apa adanya
+    new: pd.DataFrame        # Belum pernah ada -> perlu Epic sebelum ditulis
+
+def task_keys(df: pd.DataFrame):
+    """Kunci task (PIC, Canonical Backlog) untuk setiap baris, sebagai tuple yang bisa di-hash."""
+    return zip(df['PIC'].astype(str).tolist(), df['Canonical Backlog'].astype(str).tolist())
+
+class TaskIndex:
+    """
+    Hash index (PIC, Canonical Backlog) -> baris untuk task InProgress.
+    Index dapat diperbarui dengan `apply` sehingga banyak laporan bisa direkonsiliasi
+    berturut-turut tanpa membangun ulang dari sheet.
+    """
+    def __init__(self, inprogress_df: pd.DataFrame):
+        self.tasks_df = inprogress_df.reset_index(drop=True)
+        self._positions = {key: position for position, key in enumerate(task_keys(self.tasks_df))}
+        if len(self._positions) != len(self.tasks_df):
+            raise ValueError("Task InProgress harus unik per (PIC, Canonical Backlog).")
+
+    def __len__(self):
+        return len(self.tasks_df)
+
+    def reconcile(self, reported_df: pd.DataFrame, today) -> Changeset:
+        """Membandingkan task yang dilaporkan dengan index dan mengembalikan Changeset."""
+        lookup = self._positions.get
+        positions = np.fromiter((lookup(key, -1) for key in task_keys(reported_df)), dtype=np.int64, count=len(reported_df))
+        is_reported = np.zeros(len(self.tasks_df), dtype=bool)
+        is_reported[positions[positions >= 0]] = True
+
+        completed = self.tasks_df[~is_reported].copy()
+        completed['Status'] = 'Done'
+        completed['End Date'] = today
+        ongoing = self.tasks_df[is_reported]
+        new = reported_df[positions < 0]
+        return Changeset(completed=completed, ongoing=ongoing, new=new)
+
+    def apply(self, changeset: Changeset) -> 'TaskIndex':
+        """Mengembalikan index untuk keadaan setelah changeset diterapkan (ongoing + task baru)."""
+        return TaskIndex(pd.concat([changeset.ongoing, changeset.new], ignore_index=True))
@@ -1,7 +1,24 @@
 # converters/task_converter.py
-import pandas as pd
+import io
+import logging
 import re
-from datetime import datetime
+from typing import Iterable, Iterator
+import pandas as pd
+from converters.date_parser import ID_TO_EN_MONTHS, MONTH_NUMBERS
+
+logger = logging.getLogger(__name__)
+
+TASK_COLUMNS = ['Backlog', 'Canonical Backlog', 'PIC', 'Status', 'Start Date', 'End Date']
+
+# Satu pola gabungan untuk ketiga jenis baris laporan:
+#   "11 - September - 2025"  -> tanggal
+#   "1. Nama PIC"            -> PIC
+#   "- deskripsi task"       -> task
+_LINE_PATTERN = re.compile(
+    r'^(?:(?P<day>\d{1,2})\s*-\s*(?P<month>[a-zA-Z]+)\s*-\s*(?P<year>\d{4})'
+    r'|\d+\.\s*(?P<pic>.+)'
+    r'|-\s*(?P<task>.+))$'
+)
 
 def create_canonical_text(text: str) -> str:
     """Membersihkan teks untuk membuat kunci perbandingan yang andal."""
@@ -9,66 +26,64 @@ def create_canonical_text(text: str) -> str:
         return ""
     return text.lower().strip()
 
-def process_telegram_text(raw_text: str) -> pd.DataFrame:
+def iter_telegram_records(lines: Iterable[str], errors: list | None = None) -> Iterator[list]:
     """
-    HANYA mem-parsing teks laporan harian dari Telegram.
-    Tidak lagi mencoba menentukan status atau melacak tanggal antar laporan.
+    Mem-parsing baris laporan satu per satu dan menghasilkan satu record task per baris task.
+    Baris yang tidak dapat diproses dicatat ke `errors` sebagai (nomor baris, isi baris, alasan).
     """
-    print("Memulai proses Task Converter (logika disederhanakan)...")
-
-    month_map = {
-        'januari': 'January', 'februari': 'February', 'maret': 'March',
-        'april': 'April', 'mei': 'May', 'juni': 'June',
-        'juli': 'July', 'agustus': 'August', 'september': 'September',
-        'oktober': 'October', 'november': 'November', 'desember': 'December'
-    }
-
-    def parse_date_to_string(date_string):
-        """Mengubah '11 - September - 2025' menjadi '11 September 2025'."""
-        try:
-            parts = [p.strip() for p in date_string.split('-')]
-            day = parts[0]
-            month_name_id = parts[1].lower()
-            month_name_en = month_map.get(month_name_id, month_name_id).capitalize()
-            year = parts[2]
-            return f"{day} {month_name_en} {year}"
-        except (IndexError, KeyError):
-            return None
-
-    lines = raw_text.strip().split('\n')
-    processed_data = []
     current_date_str = None
     current_pic = None
 
-    for line in lines:
+    for line_number, line in enumerate(lines, start=1):
         trimmed_line = line.strip()
         if not trimmed_line or trimmed_line.startswith('='):
             continue
 
-        date_match = re.match(r'^(\d{1,2})\s*-\s*([a-zA-Z]+)\s*-\s*(\d{4})$', trimmed_line)
-        if date_match:
-            current_date_str = parse_date_to_string(trimmed_line)
-            continue
-
-        pic_match = re.match(r'^\d+\.\s*(.+)$', trimmed_line)
-        if pic_match:
-            current_pic = pic_match.group(1).strip()
+        match = _LINE_PATTERN.match(trimmed_line)
+        if match is None:
+            if errors is not None:
+                errors.append((line_number, trimmed_line, "format baris tidak dikenali"))
             continue
 
-        task_match = re.match(r'^-\s*(.+)$', trimmed_line)
-        if task_match and current_date_str and current_pic:
-            full_description = task_match.group(1).strip()
-            processed_data.append([
+        if match.group('day'):
+            month_name = match.group('month').lower()
+            if month_name not in MONTH_NUMBERS:
+                current_date_str = None
+                if errors is not None:
+                    errors.append((line_number, trimmed_line, f"nama bulan '{match.group('month')}' tidak dikenali"))
+                continue
+            # '11 - September - 2025' -> '11 September 2025'
+            month_name_en = ID_TO_EN_MONTHS.get(month_name, month_name).capitalize()
+            current_date_str = f"{match.group('day')} {month_name_en} {match.group('year')}"
+        elif match.group('pic'):
+            current_pic = match.group('pic').strip()
+        elif not (current_date_str and current_pic):
+            if errors is not None:
+                errors.append((line_number, trimmed_line, "task muncul sebelum tanggal atau PIC yang valid"))
+        else:
+            full_description = match.group('task').strip()
+            yield [
                 full_description,
                 create_canonical_text(full_description),
                 current_pic,
                 'InProgress',  # Status selalu InProgress untuk data baru
                 current_date_str, # Gunakan tanggal yang sedang aktif
                 ''             # End Date selalu kosong untuk data baru
-            ])
+            ]
+
+def process_telegram_text(raw_text: str, errors: list | None = None) -> pd.DataFrame:
+    """
+    HANYA mem-parsing teks laporan harian dari Telegram.
+    Tidak lagi mencoba menentukan status atau melacak tanggal antar laporan.
+    Baris yang gagal di-parsing dicatat ke `errors` jika diberikan.
+    """
+    logger.info("Memulai proses Task Converter (logika disederhanakan)...")
+
+    # StringIO dibaca baris demi baris, tanpa membuat salinan list seluruh baris
+    records = iter_telegram_records(io.StringIO(raw_text), errors)
+    df = pd.DataFrame.from_records(records, columns=TASK_COLUMNS)
 
-    columns = ['Backlog', 'Canonical Backlog', 'PIC', 'Status', 'Start Date', 'End Date']
-    df = pd.DataFrame(processed_data, columns=columns)
-    
-    print(f"Task Converter selesai. Ditemukan {len(df)} task.")
-    return df
\ No newline at end of file
+    logger.info(f"Task Converter selesai. Ditemukan {len(df)} task.")
+    if errors:
+        logger.warning(f"{len(errors)} baris tidak dapat di-parsing.")
+    return df
@@ -0,0 +1,125 @@
+# epic_cache.py
+import logging
+import sqlite3
+import threading
+import time
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+class EpicCache:
+    """
+    Cache persisten (SQLite) yang memetakan (PIC, Canonical Backlog) ke Epic yang sudah ditetapkan,
+    sehingga backlog yang dilaporkan ulang tidak perlu dikirim lagi ke LLM.
+    """
+    def __init__(self, db_path='epic_cache.sqlite3', max_entries=20000, max_age_days=90, namespace=''):
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 24 * 60 * 60
+        # Beberapa tim boleh berbagi satu file cache; namespace memisahkan Epic antar tim
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        # (PIC, Canonical Backlog) -> Epic yang sudah ditangani proses ini (ditulis atau sengaja dilewati
+        # karena kapasitas), agar seed dari sheet hanya memproses baris yang baru atau Epic-nya dikoreksi
+        self._known = {}
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        with self._conn:
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(epic_cache)")]
+            if columns and 'namespace' not in columns:
+                # Skema lama tanpa namespace; cache akan terisi ulang dari worksheet
+                logger.info("Skema epic cache lama ditemukan. Membuat ulang tabel cache.")
+                self._conn.execute("DROP TABLE epic_cache")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS epic_cache (
+                    namespace TEXT NOT NULL DEFAULT '',
+                    pic TEXT NOT NULL,
+                    canonical_backlog TEXT NOT NULL,
+                    epic TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, pic, canonical_backlog)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_epic_cache_updated_at ON epic_cache (namespace, updated_at)")
+        logger.info(f"Epic cache dibuka di '{db_path}'" + (f" (namespace '{namespace}')." if namespace else "."))
+
+    def get_many(self, keys: list[tuple[str, str]]) -> dict[tuple[str, str], str]:
+        """Mengembalikan Epic untuk setiap (PIC, Canonical Backlog) yang ada di cache."""
+        found = {}
+        if not keys:
+            return found
+        now = time.time()
+        with self._lock, self._conn:
+            for pic, canonical in keys:
+                row = self._conn.execute(
+                    "SELECT epic FROM epic_cache WHERE namespace = ? AND pic = ? AND canonical_backlog = ? AND updated_at >= ?",
+                    (self.namespace, pic, canonical, now - self.max_age_seconds)
+                ).fetchone()
+                if row:
+                    found[(pic, canonical)] = row[0]
+            # Sentuh entri yang dipakai agar tidak tergusur oleh aturan umur
+            self._conn.executemany(
+                "UPDATE epic_cache SET updated_at = ? WHERE namespace = ? AND pic = ? AND canonical_backlog = ?",
+                [(now, self.namespace, pic, canonical) for pic, canonical in found]
+            )
+        return found
+
+    def set_many(self, items: list[tuple[str, str, str]]):
+        """Menyimpan (PIC, Canonical Backlog, Epic). Entri yang sudah ada akan ditimpa."""
+        items = [(str(pic), str(canonical), str(epic)) for pic, canonical, epic in items if canonical and epic]
+        if not items:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO epic_cache (namespace, pic, canonical_backlog, epic, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(self.namespace, pic, canonical, epic, now) for pic, canonical, epic in items]
+            )
+            self._evict(now)
+            self._known.update(((pic, canonical), epic) for pic, canonical, epic in items)
+
+    def seed_from_df(self, data_df: pd.DataFrame):
+        """
+        Mengisi cache dari baris worksheet yang sudah memiliki Epic (sheet adalah sumber kebenaran).
+        Hanya baris yang baru atau Epic-nya dikoreksi yang ditulis. Entri lama hanya diperbarui Epic-nya
+        (updated_at tetap), dan entri baru hanya mengisi kapasitas yang masih kosong, sehingga seed
+        tidak pernah menggusur Epic hasil LLM.
+        """
+        if data_df.empty or not {'PIC', 'Canonical Backlog', 'Epic'}.issubset(data_df.columns):
+            return
+        known = self._known
+        items = [
+            (str(pic), canonical, epic.strip())
+            for pic, canonical, epic in zip(data_df['PIC'].tolist(), data_df['Canonical Backlog'].tolist(), data_df['Epic'].tolist())
+            if isinstance(epic, str) and epic.strip() and canonical and known.get((str(pic), canonical)) != epic.strip()
+        ]
+        if not items:
+            return
+        inserted = updated = 0
+        now = time.time()
+        with self._lock, self._conn:
+            free = self.max_entries - self._conn.execute(
+                "SELECT COUNT(*) FROM epic_cache WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+            # Baris terbawah (umumnya yang terbaru) didahulukan jika kapasitas tidak cukup
+            for pic, canonical, epic in reversed(items):
+                cursor = self._conn.execute(
+                    "UPDATE epic_cache SET epic = ? WHERE namespace = ? AND pic = ? AND canonical_backlog = ?",
+                    (epic, self.namespace, pic, canonical))
+                if cursor.rowcount:
+                    updated += 1
+                elif free > 0:
+                    self._conn.execute(
+                        "INSERT INTO epic_cache (namespace, pic, canonical_backlog, epic, updated_at) VALUES (?, ?, ?, ?, ?)",
+                        (self.namespace, pic, canonical, epic, now))
+                    inserted += 1
+                    free -= 1
+            # Baris yang tidak muat juga dicatat, agar tidak dicoba lagi di setiap pesan
+            known.update(((pic, canonical), epic) for pic, canonical, epic in items)
+        logger.info(f"Epic cache diisi dari worksheet: {inserted} entri baru, {updated} entri diperbarui.")
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM epic_cache WHERE namespace = ? AND updated_at < ?",
+                           (self.namespace, now - self.max_age_seconds))
+        self._conn.execute("""
+            DELETE FROM epic_cache WHERE rowid IN (
+                SELECT rowid FROM epic_cache WHERE namespace = ? ORDER BY updated_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.namespace, self.max_entries))
@@ -1,59 +1,314 @@
 # google_sheets.py
+import itertools
+import logging
+import threading
+import time
 import gspread
+from gspread.utils import rowcol_to_a1
 from oauth2client.service_account import ServiceAccountCredentials
 import pandas as pd
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Nomor versi unik untuk setiap snapshot yang disimpan, agar pemanggil bisa mengenali data yang sama persis
+_snapshot_versions = itertools.count(1)
+
+def _count_api_call(method):
+    REGISTRY.inc('backlog_bot_sheets_api_calls_total', method=method)
+
+def authorize(credentials_file):
+    """Membuat client gspread terotorisasi yang bisa dipakai bersama oleh banyak GoogleSheetsClient."""
+    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+    creds = ServiceAccountCredentials.from_json_keyfile_name(credentials_file, scope)
+    return gspread.authorize(creds)
 
 class GoogleSheetsClient:
-    def __init__(self, credentials_file, spreadsheet_id):
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        creds = ServiceAccountCredentials.from_json_keyfile_name(credentials_file, scope)
-        self.client = gspread.authorize(creds)
+    def __init__(self, credentials_file, spreadsheet_id, snapshot_max_age_seconds=600, client=None):
+        # Client gspread yang sudah diotorisasi boleh diberikan agar tidak login ulang per spreadsheet
+        self.client = client or authorize(credentials_file)
+        _count_api_call('open_by_key')
         self.spreadsheet = self.client.open_by_key(spreadsheet_id)
-        print("Berhasil terhubung ke Google Sheets.")
+        # Handle worksheet yang sudah dibuka, agar tidak mengambil metadata spreadsheet di setiap panggilan
+        self._worksheets = {}
+        self._worksheets_lock = threading.Lock()
+        # Snapshot nilai mentah (header + baris) terakhir yang dibaca/ditulis per worksheet,
+        # beserta revisi spreadsheet (modifiedTime Drive) saat snapshot itu valid.
+        self._snapshots = {}
+        # Tulisan bot ke spreadsheet ini dijalankan satu per satu agar revisi sebelum/sesudah tulis
+        # bisa dipasangkan dengan tulisan itu (lihat _carry_snapshots)
+        self._write_lock = threading.Lock()
+        self.snapshot_max_age_seconds = snapshot_max_age_seconds
+        logger.info(f"Berhasil terhubung ke Google Sheets (spreadsheet {spreadsheet_id}).")
+
+    def _worksheet(self, worksheet_name, refresh=False):
+        """Mengembalikan handle worksheet dari cache, atau mengambilnya sekali dari API."""
+        with self._worksheets_lock:
+            worksheet = None if refresh else self._worksheets.get(worksheet_name)
+        if worksheet is None:
+            _count_api_call('worksheet')
+            worksheet = self.spreadsheet.worksheet(worksheet_name)
+            with self._worksheets_lock:
+                self._worksheets[worksheet_name] = worksheet
+        return worksheet
+
+    def _forget_worksheet(self, worksheet_name):
+        """Membuang handle yang mungkin basi (worksheet diganti nama, dihapus, atau diubah ukurannya)."""
+        with self._worksheets_lock:
+            self._worksheets.pop(worksheet_name, None)
 
     def get_existing_epics(self, worksheet_name, epic_column_index=1):
         try:
-            worksheet = self.spreadsheet.worksheet(worksheet_name)
-            print(f"Membaca daftar Epic yang ada dari worksheet '{worksheet_name}'...")
+            worksheet = self._worksheet(worksheet_name)
+            logger.info(f"Membaca daftar Epic yang ada dari worksheet '{worksheet_name}'...")
+            _count_api_call('col_values')
             all_epics = worksheet.col_values(epic_column_index)
             existing_epics = sorted(list(set([epic for epic in all_epics[1:] if epic])))
-            print(f"Ditemukan {len(existing_epics)} Epic unik.")
+            logger.info(f"Ditemukan {len(existing_epics)} Epic unik.")
             return existing_epics
         except Exception as e:
-            print(f"Error saat membaca Epic dari Google Sheets: {e}")
+            logger.error(f"Error saat membaca Epic dari Google Sheets: {e}")
             return []
 
+    def _get_revision(self):
+        """Mengambil modifiedTime spreadsheet dari Drive API (satu request metadata yang ringan)."""
+        try:
+            _count_api_call('get_last_update_time')
+            return self.spreadsheet.get_lastUpdateTime()
+        except Exception as e:
+            logger.warning(f"Gagal membaca revisi spreadsheet: {e}")
+            return None
+
+    def _store_snapshot(self, worksheet_name, values, revision):
+        version = next(_snapshot_versions)
+        self._snapshots[worksheet_name] = {'values': values, 'revision': revision, 'stored_at': time.monotonic(),
+                                           'version': version}
+        return version
+
+    def _carry_snapshots(self, worksheet_name, revision_before):
+        """
+        Dipanggil tepat setelah bot menulis ke `worksheet_name`. Revisi Drive berlaku untuk seluruh
+        spreadsheet, jadi tanpa ini tulisan bot ke satu tab (worksheet tim lain, tab arsip) membuat
+        snapshot semua tab lain basi. Snapshot yang revisinya masih sama dengan revisi tepat sebelum
+        menulis ikut dibawa ke revisi baru; edit manual di tab mana pun tetap membatalkan semuanya.
+        Mengembalikan revisi sesudah tulis.
+        """
+        revision_after = self._get_revision()
+        if revision_before is not None and revision_after is not None:
+            for name, snapshot in list(self._snapshots.items()):
+                if name != worksheet_name and snapshot['revision'] == revision_before:
+                    snapshot['revision'] = revision_after
+        return revision_after
+
+    def _get_valid_snapshot(self, worksheet_name):
+        """Mengembalikan snapshot jika spreadsheet tidak diubah di luar bot sejak snapshot diambil."""
+        snapshot = self._snapshots.get(worksheet_name)
+        if snapshot is None or snapshot['revision'] is None:
+            return None, None
+        # Batas umur sebagai pengaman jika modifiedTime Drive terlambat diperbarui
+        if time.monotonic() - snapshot['stored_at'] > self.snapshot_max_age_seconds:
+            return None, None
+        revision = self._get_revision()
+        if revision is not None and revision == snapshot['revision']:
+            return snapshot, revision
+        return None, revision
+
     def get_all_data_as_df(self, worksheet_name):
-        """Membaca seluruh data dari worksheet dan mengembalikannya sebagai DataFrame Pandas."""
+        """
+        Membaca seluruh data dari worksheet dan mengembalikannya sebagai DataFrame Pandas.
+        Jika revisi spreadsheet tidak berubah sejak pembacaan/penulisan terakhir oleh bot,
+        data diambil dari snapshot lokal tanpa mengunduh ulang worksheet.
+        """
         try:
-            worksheet = self.spreadsheet.worksheet(worksheet_name)
-            print(f"Membaca seluruh data dari worksheet '{worksheet_name}'...")
-            data = worksheet.get_all_records()
-            df = pd.DataFrame(data)
-            print(f"Berhasil membaca {len(df)} baris data.")
+            snapshot, revision = self._get_valid_snapshot(worksheet_name)
+            if snapshot is not None:
+                values = snapshot['values']
+                df = pd.DataFrame(values[1:], columns=values[0]) if values else pd.DataFrame()
+                # Versi snapshot memberi tahu pemanggil bahwa isi sheet sama persis dengan tulisan terakhir bot
+                df.attrs['sheet_version'] = snapshot['version']
+                logger.info(f"Snapshot worksheet '{worksheet_name}' masih valid. Memakai {len(df)} baris dari cache.")
+                return df
+
+            if revision is None:
+                revision = self._get_revision()
+            # Baca penuh berarti sheet berubah di luar bot (atau belum pernah dibaca), jadi ukuran grid
+            # di handle lama bisa basi; ambil ulang handle-nya sekalian
+            worksheet = self._worksheet(worksheet_name, refresh=True)
+            logger.info(f"Membaca seluruh data dari worksheet '{worksheet_name}'...")
+            _count_api_call('get_all_values')
+            values = worksheet.get_all_values()
+            # Revisi diambil sebelum membaca, sehingga edit di tengah pembacaan memicu baca ulang berikutnya
+            version = self._store_snapshot(worksheet_name, values, revision)
+            df = pd.DataFrame(values[1:], columns=values[0]) if values else pd.DataFrame()
+            df.attrs['sheet_version'] = version
+            logger.info(f"Berhasil membaca {len(df)} baris data.")
             return df
         except gspread.exceptions.WorksheetNotFound:
-            print(f"Error: Worksheet '{worksheet_name}' tidak ditemukan.")
+            logger.warning(f"Worksheet '{worksheet_name}' tidak ditemukan.")
+            self._forget_worksheet(worksheet_name)
             return pd.DataFrame()
         except Exception as e:
-            print(f"Error saat membaca seluruh data dari Google Sheets: {e}")
+            logger.error(f"Error saat membaca seluruh data dari Google Sheets: {e}")
+            self._forget_worksheet(worksheet_name)
             return pd.DataFrame()
 
     def overwrite_worksheet_with_df(self, worksheet_name, data_df: pd.DataFrame):
         """Menghapus semua konten di worksheet dan menulis ulang dengan data dari DataFrame."""
         try:
-            worksheet = self.spreadsheet.worksheet(worksheet_name)
-            print(f"Menghapus dan menulis ulang worksheet '{worksheet_name}'...")
+            worksheet = self._worksheet(worksheet_name)
+            logger.info(f"Menghapus dan menulis ulang worksheet '{worksheet_name}'...")
             
-            # Hapus semua konten
-            worksheet.clear()
-            
-            # Tulis ulang header dan data
-            worksheet.update([data_df.columns.values.tolist()] + data_df.values.tolist(),
-                              value_input_option='USER_ENTERED')
-            
-            print(f"Berhasil menulis ulang {len(data_df)} baris data.")
+            with self._write_lock:
+                revision_before = self._get_revision()
+                # Hapus semua konten
+                _count_api_call('clear')
+                worksheet.clear()
+
+                # Tulis ulang header dan data
+                _count_api_call('update')
+                worksheet.update([data_df.columns.values.tolist()] + data_df.values.tolist(),
+                                  value_input_option='USER_ENTERED')
+                revision = self._carry_snapshots(worksheet_name, revision_before)
+
+            self._store_snapshot(worksheet_name, [data_df.columns.values.tolist()] + data_df.values.tolist(), revision)
+            logger.info(f"Berhasil menulis ulang {len(data_df)} baris data.")
+            return len(data_df)
+        except Exception as e:
+            logger.error(f"Error saat menulis ulang worksheet: {e}")
+            self._forget_worksheet(worksheet_name)
+            raise
+
+    def append_rows_to_worksheet(self, worksheet_name, data_df: pd.DataFrame):
+        """Menambahkan baris di akhir worksheet. Worksheet dibuat (beserta header) jika belum ada."""
+        try:
+            try:
+                worksheet = self._worksheet(worksheet_name)
+                rows = data_df.fillna('').values.tolist()
+            except gspread.exceptions.WorksheetNotFound:
+                logger.info(f"Worksheet '{worksheet_name}' belum ada. Membuat worksheet baru...")
+                _count_api_call('add_worksheet')
+                worksheet = self.spreadsheet.add_worksheet(title=worksheet_name, rows=len(data_df) + 1, cols=len(data_df.columns))
+                with self._worksheets_lock:
+                    self._worksheets[worksheet_name] = worksheet
+                rows = [data_df.columns.values.tolist()] + data_df.fillna('').values.tolist()
+            with self._write_lock:
+                revision_before = self._get_revision()
+                # Snapshot tab ini tidak memuat baris tambahan, jadi dibuang agar pembacaan berikutnya penuh
+                self._snapshots.pop(worksheet_name, None)
+                _count_api_call('append_rows')
+                worksheet.append_rows(rows, value_input_option='USER_ENTERED')
+                self._carry_snapshots(worksheet_name, revision_before)
+            logger.info(f"Berhasil menambahkan {len(data_df)} baris ke worksheet '{worksheet_name}'.")
             return len(data_df)
         except Exception as e:
-            print(f"Error saat menulis ulang worksheet: {e}")
-            raise
\ No newline at end of file
+            logger.error(f"Error saat menambahkan baris ke worksheet: {e}")
+            self._forget_worksheet(worksheet_name)
+            raise
+
+    def sync_worksheet_with_df(self, worksheet_name, data_df: pd.DataFrame):
+        """
+        Menulis hanya sel yang berubah dibanding snapshot terakhir dalam satu batch_update.
+        Baris tambahan ikut ditulis dan baris yang hilang dikosongkan. Tanpa snapshot, atau jika
+        sheet diubah di luar bot sejak snapshot diambil (diff terhadap grid lama akan mencampur sel
+        antar baris), jatuh kembali ke overwrite_worksheet_with_df. Mengembalikan statistik penulisan.
+        """
+        snapshot = self._snapshots.get(worksheet_name)
+        if snapshot is None:
+            return self._overwrite_with_stats(worksheet_name, data_df)
+        try:
+            worksheet = self._worksheet(worksheet_name)
+            new_grid = [[str(col) for col in data_df.columns]] + data_df.fillna('').astype(str).values.tolist()
+            ranges, stats = self._diff_grids(snapshot['values'], new_grid)
+            logger.info(f"Sinkronisasi worksheet '{worksheet_name}': {stats['cells_written']} sel ditulis, "
+                  f"{stats['cells_unchanged']} sel tidak berubah, {stats['cells_blanked']} sel dikosongkan, "
+                  f"{stats['rows_appended']} baris ditambah, "
+                  f"{stats['rows_deleted']} baris dihapus.", extra={'worksheet': worksheet_name, **stats})
+
+            # Tulisan bot sendiri memperbarui snapshot, jadi revisi sesudah tulis dianggap milik bot
+            revision = snapshot['revision']
+            if ranges:
+                with self._write_lock:
+                    revision_before = self._get_revision()
+                    # _carry_snapshots menjaga revisi snapshot tetap terkini melewati tulisan bot sendiri,
+                    # jadi revisi yang berbeda berarti ada edit di luar bot setelah snapshot diambil
+                    stale = revision_before is None or revision_before != snapshot['revision']
+                    if not stale:
+                        # Sheets API menolak range di luar ukuran grid, jadi perbesar dulu jika perlu
+                        needed_rows = len(new_grid)
+                        needed_cols = max(len(row) for row in new_grid)
+                        if needed_rows > worksheet.row_count:
+                            _count_api_call('add_rows')
+                            worksheet.add_rows(needed_rows - worksheet.row_count)
+                        if needed_cols > worksheet.col_count:
+                            _count_api_call('add_cols')
+                            worksheet.add_cols(needed_cols - worksheet.col_count)
+                        _count_api_call('batch_update')
+                        worksheet.batch_update(ranges, value_input_option='USER_ENTERED')
+                        revision = self._carry_snapshots(worksheet_name, revision_before)
+                if stale:
+                    logger.warning(f"Worksheet '{worksheet_name}' berubah di luar bot sejak dibaca. "
+                                   f"Menulis ulang seluruh worksheet alih-alih sinkronisasi per sel.")
+                    self._snapshots.pop(worksheet_name, None)
+                    return self._overwrite_with_stats(worksheet_name, data_df)
+            stats['sheet_version'] = self._store_snapshot(worksheet_name, new_grid, revision)
+            stats['rows'] = len(data_df)
+            return stats
+        except Exception as e:
+            logger.error(f"Error saat sinkronisasi worksheet: {e}")
+            self._forget_worksheet(worksheet_name)
+            raise
+
+    def _overwrite_with_stats(self, worksheet_name, data_df):
+        rows = self.overwrite_worksheet_with_df(worksheet_name, data_df)
+        cells = (rows + 1) * len(data_df.columns)
+        return {'rows': rows, 'cells_written': cells, 'cells_unchanged': 0, 'cells_blanked': 0,
+                'rows_appended': rows, 'rows_deleted': 0}
+
+    @staticmethod
+    def _diff_grids(old_grid, new_grid):
+        """
+        Membandingkan dua grid dan mengelompokkan baris berurutan yang berubah menjadi satu range.
+        `cells_written` adalah jumlah sel yang dikirim (termasuk sel tak berubah di dalam range persegi),
+        `cells_unchanged` dihitung per sel grid baru yang isinya sama, dan `cells_blanked` adalah sel lama
+        yang dikosongkan karena baris/kolomnya tidak ada lagi.
+        """
+        ranges = []
+        stats = {'cells_written': 0, 'cells_unchanged': 0, 'cells_blanked': 0,
+                 'rows_appended': max(0, len(new_grid) - len(old_grid)),
+                 'rows_deleted': max(0, len(old_grid) - len(new_grid))}
+        block = None  # [baris_awal, kolom_awal, kolom_akhir, daftar_baris]
+
+        def flush():
+            if block is None:
+                return
+            start_row, first_col, last_col, rows = block
+            values = [(row + [''] * (last_col + 1))[first_col:last_col + 1] for row in rows]
+            ranges.append({
+                'range': f"{rowcol_to_a1(start_row + 1, first_col + 1)}:{rowcol_to_a1(start_row + len(rows), last_col + 1)}",
+                'values': values
+            })
+            stats['cells_written'] += len(values) * (last_col - first_col + 1)
+
+        for i in range(max(len(old_grid), len(new_grid))):
+            old_row = [str(value) for value in old_grid[i]] if i < len(old_grid) else []
+            # Baris yang dihapus ditimpa dengan sel kosong
+            new_row = new_grid[i] if i < len(new_grid) else [''] * len(old_row)
+            width = max(len(old_row), len(new_row))
+            new_width = len(new_row) if i < len(new_grid) else 0
+            old_row = old_row + [''] * (width - len(old_row))
+            new_row = new_row + [''] * (width - len(new_row))
+            changed = [col for col in range(width) if old_row[col] != new_row[col]]
+            stats['cells_unchanged'] += new_width - sum(1 for col in changed if col < new_width)
+            stats['cells_blanked'] += sum(1 for col in changed if col >= new_width)
+            if not changed:
+                flush()
+                block = None
+                continue
+            if block is None:
+                block = [i, changed[0], changed[-1], [new_row]]
+            else:
+                block[1] = min(block[1], changed[0])
+                block[2] = max(block[2], changed[-1])
+                block[3].append(new_row)
+        flush()
+        return ranges, stats
\ No newline at end of file
@@ -0,0 +1,160 @@
+# job_queue.py
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+JOB_ACCEPTED = 'accepted'
+JOB_DUPLICATE = 'duplicate'
+JOB_REJECTED = 'rejected'
+
+class JobQueue:
+    """
+    Antrean job dengan jumlah worker tetap dan batas antrean (backpressure).
+    Job dengan key yang sama (misalnya nama worksheet) dijalankan berurutan,
+    job dengan key berbeda boleh berjalan paralel.
+
+    Jika `coalesce_window_seconds` > 0, job ditahan selama jendela tersebut sebelum dijalankan.
+    Job baru untuk key yang sama membatalkan job yang belum mulai, sehingga dalam satu jendela
+    hanya job terbaru yang dijalankan.
+
+    `max_pending_per_key` membatasi job menunggu per key, sehingga satu key yang kebanjiran
+    tidak menghabiskan kapasitas antrean key lain.
+    """
+    def __init__(self, num_workers=4, max_pending=100, dedup_size=1000, coalesce_window_seconds=0, max_pending_per_key=None):
+        self.max_pending = max_pending
+        self.max_pending_per_key = max_pending_per_key
+        self.coalesce_window_seconds = coalesce_window_seconds
+        self.dedup_size = dedup_size
+        self._lock = threading.Lock()
+        self._jobs_by_key = {}
+        # Key yang sedang menunggu di _ready_keys atau sedang dijalankan worker
+        self._scheduled_keys = set()
+        # Job yang sudah diambil worker tetapi masih menunggu jendela coalescing, per key
+        self._delayed_jobs = {}
+        self._ready_keys = queue.Queue()
+        self._seen_job_ids = OrderedDict()
+        self._pending = 0
+        self._stats = {'accepted': 0, 'duplicates': 0, 'rejected': 0, 'superseded': 0, 'completed': 0, 'failed': 0,
+                       'total_wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+        for i in range(num_workers):
+            threading.Thread(target=self._worker_loop, name=f"job-worker-{i + 1}", daemon=True).start()
+        logger.info(f"JobQueue dimulai dengan {num_workers} worker (maks {max_pending} job menunggu).")
+
+    def submit(self, key, func, *args, job_id=None):
+        """Memasukkan job ke antrean. Mengembalikan JOB_ACCEPTED, JOB_DUPLICATE, atau JOB_REJECTED."""
+        with self._lock:
+            if job_id is not None and job_id in self._seen_job_ids:
+                self._stats['duplicates'] += 1
+                logger.warning(f"Job {job_id} sudah pernah diterima. Diabaikan.")
+                return JOB_DUPLICATE
+            key_pending = len(self._jobs_by_key.get(key, ()))
+            pending = self._pending
+            if self.coalesce_window_seconds > 0:
+                # Job menunggu untuk key ini akan digantikan, jadi tidak dihitung terhadap kapasitas
+                pending -= key_pending
+                key_pending = 0
+            if pending >= self.max_pending:
+                self._stats['rejected'] += 1
+                logger.warning(f"Antrean penuh ({pending} job). Job {job_id} ditolak.")
+                return JOB_REJECTED
+            if self.max_pending_per_key is not None and key_pending >= self.max_pending_per_key:
+                self._stats['rejected'] += 1
+                logger.warning(f"Antrean untuk '{key}' penuh ({key_pending} job). Job {job_id} ditolak.")
+                return JOB_REJECTED
+            # Job lama baru dibatalkan setelah job baru pasti diterima, agar laporan tidak hilang keduanya
+            if self.coalesce_window_seconds > 0:
+                self._supersede_pending_jobs(key)
+
+            if job_id is not None:
+                self._seen_job_ids[job_id] = True
+                if len(self._seen_job_ids) > self.dedup_size:
+                    self._seen_job_ids.popitem(last=False)
+            now = time.monotonic()
+            self._jobs_by_key.setdefault(key, deque()).append({
+                'func': func, 'args': args, 'enqueued_at': now,
+                'run_at': now + self.coalesce_window_seconds, 'cancelled': threading.Event()
+            })
+            self._pending += 1
+            self._stats['accepted'] += 1
+            if key not in self._scheduled_keys:
+                self._scheduled_keys.add(key)
+                self._ready_keys.put(key)
+        return JOB_ACCEPTED
+
+    def _supersede_pending_jobs(self, key):
+        """Membatalkan semua job untuk key ini yang belum mulai berjalan. Dipanggil dengan lock dipegang."""
+        superseded = len(self._jobs_by_key.get(key, ()))
+        if superseded:
+            self._jobs_by_key[key].clear()
+            self._pending -= superseded
+        delayed_job = self._delayed_jobs.pop(key, None)
+        if delayed_job is not None:
+            delayed_job['cancelled'].set()
+            superseded += 1
+        if superseded:
+            self._stats['superseded'] += superseded
+            logger.info(f"{superseded} job untuk '{key}' digantikan oleh laporan yang lebih baru.")
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['queue_depth'] = self._pending
+        started = stats['completed'] + stats['failed']
+        stats['avg_wait_seconds'] = stats['total_wait_seconds'] / started if started else 0.0
+        return stats
+
+    def _worker_loop(self):
+        while True:
+            key = self._ready_keys.get()
+            with self._lock:
+                job = self._jobs_by_key[key].popleft() if self._jobs_by_key[key] else None
+                if job is not None:
+                    self._pending -= 1
+                    delay = job['run_at'] - time.monotonic()
+                    if delay > 0:
+                        self._delayed_jobs[key] = job
+
+            if job is not None and delay > 0:
+                # Tunggu jendela coalescing; berhenti lebih awal jika digantikan job yang lebih baru
+                job['cancelled'].wait(delay)
+                with self._lock:
+                    if self._delayed_jobs.get(key) is job:
+                        del self._delayed_jobs[key]
+            if job is not None and job['cancelled'].is_set():
+                job = None
+
+            if job is not None:
+                self._run_job(key, job)
+
+            with self._lock:
+                # Key baru dijadwalkan ulang setelah job selesai agar job per key tetap berurutan
+                if self._jobs_by_key[key]:
+                    self._ready_keys.put(key)
+                else:
+                    del self._jobs_by_key[key]
+                    self._scheduled_keys.discard(key)
+
+    def _run_job(self, key, job):
+        wait_seconds = time.monotonic() - job['enqueued_at']
+        with self._lock:
+            self._stats['total_wait_seconds'] += wait_seconds
+            self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], wait_seconds)
+            depth = self._pending
+        REGISTRY.observe('backlog_bot_job_wait_seconds', wait_seconds)
+        logger.info(f"Menjalankan job untuk '{key}' (menunggu {wait_seconds:.2f} detik, {depth} job tersisa di antrean).",
+                    extra={'job_key': key, 'wait_seconds': round(wait_seconds, 3), 'queue_depth': depth})
+
+        try:
+            job['func'](*job['args'])
+            outcome = 'completed'
+        except Exception as e:
+            logger.exception(f"Error di job untuk '{key}': {e}")
+            outcome = 'failed'
+
+        with self._lock:
+            self._stats[outcome] += 1
@@ -0,0 +1,153 @@
+# metrics.py
+import json
+import logging
+import threading
+
+# Batas bucket histogram durasi (detik), dari operasi lokal hingga panggilan LLM yang lambat
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+def _escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label_value(value)}"' for name, value in labels) + '}'
+
+def _format_value(value):
+    return repr(float(value)) if value != float('inf') else '+Inf'
+
+class MetricsRegistry:
+    """
+    Registry counter, gauge, dan histogram sederhana yang dirender dalam format teks Prometheus.
+    Nilai yang hanya perlu dibaca saat scrape (misalnya kedalaman antrean) diambil lewat collector.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._descriptions = {}   # nama -> (tipe, keterangan)
+        self._values = {}         # (nama, label) -> nilai counter/gauge
+        self._histograms = {}     # (nama, label) -> [jumlah per bucket, total, count]
+        self._collectors = {}     # nama -> fungsi collector
+
+    def describe(self, name, metric_type, help_text):
+        self._descriptions[name] = (metric_type, help_text)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def add_collector(self, name, collector):
+        """
+        `collector()` dipanggil saat render dan menghasilkan (nama, dict label, nilai).
+        Collector dengan `name` yang sama menggantikan yang lama, sehingga create_app() yang
+        dipanggil berulang (misalnya di test atau reload) tidak menumpuk collector.
+        """
+        with self._lock:
+            self._collectors[name] = collector
+
+    def render(self) -> str:
+        with self._lock:
+            values = dict(self._values)
+            histograms = {key: (list(counts), total, count) for key, (counts, total, count) in self._histograms.items()}
+            collectors = list(self._collectors.values())
+        for collector in collectors:
+            try:
+                for name, labels, value in collector():
+                    values[(name, tuple(sorted(labels.items())))] = value
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"Collector metrics gagal: {e}")
+
+        samples_by_name = {}
+        for (name, labels), value in sorted(values.items()):
+            samples_by_name.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), (counts, total, count) in sorted(histograms.items()):
+            samples = samples_by_name.setdefault(name, [])
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts + [count]):
+                samples.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {bucket_count}")
+            samples.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            samples.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        lines = []
+        for name in sorted(samples_by_name):
+            metric_type, help_text = self._descriptions.get(name, (GAUGE, ''))
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(samples_by_name[name])
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+REGISTRY.describe('backlog_bot_updates_total', COUNTER, "Update Telegram yang diproses, per hasil.")
+REGISTRY.describe('backlog_bot_stage_duration_seconds', HISTOGRAM, "Durasi setiap tahap pipeline.")
+REGISTRY.describe('backlog_bot_llm_calls_total', COUNTER, "Panggilan LLM per API key dan hasil.")
+REGISTRY.describe('backlog_bot_llm_tokens_total', COUNTER, "Token LLM yang terpakai per API key.")
+REGISTRY.describe('backlog_bot_llm_call_duration_seconds', HISTOGRAM, "Durasi panggilan LLM per API key.")
+REGISTRY.describe('backlog_bot_llm_prompt_chars_total', COUNTER, "Jumlah karakter prompt yang dikirim ke LLM.")
+REGISTRY.describe('backlog_bot_epic_cache_hits_total', COUNTER, "Task yang Epic-nya diambil dari epic cache.")
+REGISTRY.describe('backlog_bot_epic_auto_assigned_total', COUNTER, "Task yang Epic-nya ditetapkan dari backlog serupa tanpa LLM.")
+REGISTRY.describe('backlog_bot_sheets_api_calls_total', COUNTER, "Panggilan Google Sheets/Drive API per method.")
+REGISTRY.describe('backlog_bot_telegram_api_calls_total', COUNTER, "Panggilan Telegram Bot API per method dan status HTTP.")
+REGISTRY.describe('backlog_bot_job_queue_depth', GAUGE, "Job yang menunggu di antrean.")
+REGISTRY.describe('backlog_bot_jobs_total', COUNTER, "Job di antrean per status.")
+REGISTRY.describe('backlog_bot_job_wait_seconds', HISTOGRAM, "Lama job menunggu di antrean sebelum dijalankan.")
+REGISTRY.describe('backlog_bot_services_ready', GAUGE, "1 jika semua client sudah selesai warm-up.")
+REGISTRY.describe('backlog_bot_llm_key_circuit_open', GAUGE, "1 jika circuit breaker API key sedang terbuka.")
+
+# Atribut bawaan LogRecord; atribut lain (dari `extra=`) ikut ditulis sebagai field log
+_RESERVED_LOG_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+def _extra_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RESERVED_LOG_ATTRS}
+
+class JsonLogFormatter(logging.Formatter):
+    """Satu objek JSON per baris: waktu, level, logger, pesan, dan field tambahan dari `extra=`."""
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            **_extra_fields(record),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class KeyValueLogFormatter(logging.Formatter):
+    """Format teks biasa yang diakhiri field tambahan sebagai key=value."""
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+def configure_logging(level='INFO', log_format='json'):
+    """Mengatur root logger: 'json' untuk log terstruktur, 'text' untuk dibaca langsung di terminal/PM2."""
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonLogFormatter() if log_format == 'json' else KeyValueLogFormatter())
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level.upper() if isinstance(level, str) else level)
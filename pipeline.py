@@ -0,0 +1,239 @@
+# pipeline.py
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+
+from converters.task_converter import process_telegram_text, create_canonical_text
+from converters.date_parser import parse_mixed_language_dates, SHEET_DATE_FORMAT
+from converters.reconciler import Changeset, TaskIndex, task_keys
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ['Epic', 'Backlog', 'PIC', 'Status', 'Start Date', 'End Date']
+
+# Nama tahap sesuai langkah bernomor di BacklogPipeline.process_message
+STAGES = ['read_sheet', 'parse_report', 'reconcile', 'classify', 'merge', 'sort', 'archive', 'write_sheet']
+
+def format_parse_errors(parse_errors, max_lines=5):
+    """Meringkas baris laporan yang gagal di-parsing untuk pesan feedback admin."""
+    if not parse_errors:
+        return ""
+    lines = [f"- Baris {line_number}: {reason} ('{line[:40]}')" for line_number, line, reason in parse_errors[:max_lines]]
+    if len(parse_errors) > max_lines:
+        lines.append(f"- ... dan {len(parse_errors) - max_lines} baris lainnya")
+    return f"\n\n⚠️ {len(parse_errors)} baris diabaikan:\n" + "\n".join(lines)
+
+def format_unclassified_tasks(tasks_df, max_lines=5):
+    """Meringkas task baru yang gagal mendapat Epic (dan karena itu belum ditulis) untuk feedback admin."""
+    if tasks_df.empty:
+        return ""
+    lines = [f"- {pic}: {backlog[:40]}" for pic, backlog in zip(tasks_df['PIC'].head(max_lines), tasks_df['Backlog'].head(max_lines))]
+    if len(tasks_df) > max_lines:
+        lines.append(f"- ... dan {len(tasks_df) - max_lines} task lainnya")
+    return (f"\n\n⚠️ {len(tasks_df)} task baru belum mendapat Epic dan belum ditulis "
+            f"(akan dicoba lagi pada laporan berikutnya):\n" + "\n".join(lines))
+
+def strip_bot_mention(text, bot_username):
+    """Membuang baris yang berisi mention bot, menyisakan teks laporan."""
+    lines = text.strip().split('\n')
+    return "\n".join(line for line in lines if f"@{bot_username}" not in line)
+
+def parse_report(text, bot_username, errors=None):
+    """Mem-parsing teks laporan Telegram menjadi task unik per (PIC, Canonical Backlog)."""
+    intermediate_df = process_telegram_text(strip_bot_mention(text, bot_username), errors=errors)
+    if not intermediate_df.empty:
+        intermediate_df.drop_duplicates(subset=['PIC', 'Canonical Backlog'], keep='first', inplace=True)
+    return intermediate_df
+
+def prepare_existing_df(existing_df):
+    """Memvalidasi kolom sheet, mem-parsing tanggal, dan menambahkan 'Canonical Backlog' (duplikat dibuang)."""
+    for col in REQUIRED_COLUMNS:
+        if col not in existing_df.columns:
+            raise KeyError(f"Kolom '{col}' tidak ditemukan di Google Sheet.")
+
+    existing_df['Start Date'] = parse_mixed_language_dates(existing_df['Start Date'])
+    existing_df['End Date'] = parse_mixed_language_dates(existing_df['End Date'])
+    existing_df['Canonical Backlog'] = existing_df['Backlog'].apply(create_canonical_text)
+    existing_df.drop_duplicates(subset=['PIC', 'Canonical Backlog'], keep='last', inplace=True)
+    return existing_df
+
+def merge_parts(parts):
+    """Menggabungkan potongan data (Done, selesai, berjalan, baru) menjadi kolom-kolom sheet."""
+    parts = [df for df in parts if not df.empty]
+    final_df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=REQUIRED_COLUMNS)
+    return final_df[REQUIRED_COLUMNS]
+
+def sort_for_sheet(final_df):
+    """Mem-parsing kolom tanggal lalu mensortir berdasarkan Start Date dan Epic."""
+    final_df['Start Date'] = parse_mixed_language_dates(final_df['Start Date'])
+    final_df['End Date'] = parse_mixed_language_dates(final_df['End Date'])
+    return final_df.sort_values(by=['Start Date', 'Epic'], ascending=[True, True], na_position='last')
+
+def format_dates_for_sheet(final_df):
+    """Salinan data dengan kolom tanggal diformat seperti di sheet ('11 September 2025')."""
+    final_df = final_df.copy()
+    final_df['Start Date'] = final_df['Start Date'].dt.strftime(SHEET_DATE_FORMAT).fillna('')
+    final_df['End Date'] = final_df['End Date'].dt.strftime(SHEET_DATE_FORMAT).fillna('')
+    return final_df
+
+class BacklogPipeline:
+    """
+    Alur baca sheet -> parsing laporan -> rekonsiliasi -> Epic -> tulis sheet untuk satu worksheet.
+    Semua client diberikan dari luar, sehingga alur yang sama bisa dijalankan dengan client palsu
+    (lihat benchmarks/bench_pipeline.py). Durasi setiap tahap dari pemrosesan terakhir ada di `last_timings`.
+    """
+    def __init__(self, bot, sheets_client, backlog_processor, worksheet_name, admin_ids, bot_username,
+                 epic_cache=None, epic_index=None, archiver=None, name=None):
+        self.bot = bot
+        self.sheets_client = sheets_client
+        self.backlog_processor = backlog_processor
+        self.worksheet_name = worksheet_name
+        # Admin yang boleh mengirim laporan; feedback dikirim ke admin pengirim
+        self.admin_ids = {str(admin_id) for admin_id in ([admin_ids] if isinstance(admin_ids, (str, int)) else admin_ids)}
+        self.name = name or worksheet_name
+        self.bot_username = bot_username
+        self.epic_cache = epic_cache
+        self.epic_index = epic_index
+        self.archiver = archiver
+        self.last_timings = {}
+        # TaskIndex InProgress setelah tulisan terakhir, beserta versi snapshot sheet yang ditulis.
+        # Selama sheet tidak diubah di luar bot, index ini dimajukan dengan apply() alih-alih dibangun ulang.
+        self._task_index = None
+        self._task_index_version = None
+
+    @contextmanager
+    def _stage(self, timings, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings[name] = time.perf_counter() - started
+            REGISTRY.observe('backlog_bot_stage_duration_seconds', timings[name], stage=name, route=self.name)
+
+    def _finish(self, result, timings):
+        REGISTRY.inc('backlog_bot_updates_total', result=result, route=self.name)
+        logger.info(f"Pemrosesan update selesai: {result}.", extra={
+            'route': self.name, 'worksheet': self.worksheet_name, 'result': result,
+            'stage_ms': {name: round(seconds * 1000, 1) for name, seconds in timings.items()},
+        })
+        return result == 'success'
+
+    def process_message(self, data):
+        """Memproses satu update Telegram. Mengembalikan True jika worksheet berhasil diperbarui."""
+        timings = {}
+        self.last_timings = timings
+        admin_chat_id = None
+        try:
+            message = data['message']
+            text = message.get('text', '')
+            user_id_from_message = str(message['from']['id'])
+
+            if user_id_from_message not in self.admin_ids:
+                logger.warning(f"Akses ditolak untuk User ID: {user_id_from_message}.")
+                REGISTRY.inc('backlog_bot_updates_total', result='unauthorized', route=self.name)
+                return False
+            admin_chat_id = user_id_from_message
+
+            logger.info(f"Akses diberikan untuk admin. Memulai proses update status...")
+
+            # 1. BACA DATA DAN TANGANI KASUS KOSONG
+            with self._stage(timings, 'read_sheet'):
+                existing_df = self.sheets_client.get_all_data_as_df(worksheet_name=self.worksheet_name)
+                sheet_version = existing_df.attrs.get('sheet_version')
+
+                if existing_df.empty:
+                    logger.info("Worksheet kosong. Menginisialisasi DataFrame kosong.")
+                    done_tasks_df = pd.DataFrame(columns=REQUIRED_COLUMNS)
+                    inprogress_tasks_df = pd.DataFrame(columns=REQUIRED_COLUMNS + ['Canonical Backlog'])
+                else:
+                    existing_df = prepare_existing_df(existing_df)
+                    if self.epic_cache is not None:
+                        self.epic_cache.seed_from_df(existing_df)
+                    if self.epic_index is not None:
+                        self.epic_index.update_from_df(existing_df)
+
+                    done_tasks_df = existing_df[existing_df['Status'] == 'Done'].copy().reset_index(drop=True)
+                    inprogress_tasks_df = existing_df[existing_df['Status'] == 'InProgress'].copy().reset_index(drop=True)
+
+            # 2. PROSES INPUT BARU DARI TELEGRAM
+            with self._stage(timings, 'parse_report'):
+                parse_errors = []
+                intermediate_df = parse_report(text, self.bot_username, errors=parse_errors)
+
+            if intermediate_df.empty:
+                self.bot.send_message_async(admin_chat_id, "Proses Gagal: Task Converter tidak menghasilkan data." + format_parse_errors(parse_errors))
+                return self._finish('no_tasks', timings)
+
+            # 3. REKONSILIASI MENGGUNAKAN KUNCI KANONIS (PIC + CANONICAL BACKLOG)
+            with self._stage(timings, 'reconcile'):
+                if sheet_version is not None and sheet_version == self._task_index_version:
+                    task_index = self._task_index
+                else:
+                    task_index = TaskIndex(inprogress_tasks_df)
+                changeset = task_index.reconcile(intermediate_df, today=datetime.now())
+            logger.info(f"Rekonsiliasi: {len(changeset.completed)} selesai, {len(changeset.ongoing)} berjalan, {len(changeset.new)} baru.")
+
+            # 4. DAPATKAN EPIC HANYA UNTUK TASK YANG BENAR-BENAR BARU (BATCH, PARALEL)
+            with self._stage(timings, 'classify'):
+                new_tasks_with_epics_df = changeset.new
+                if not changeset.new.empty:
+                    existing_epics = list(existing_df['Epic'].unique()) if not existing_df.empty else []
+                    new_tasks_with_epics_df = self.backlog_processor.get_epics_for_tasks_batched(
+                        intermediate_df=changeset.new,
+                        existing_epics=existing_epics
+                    )
+
+            if new_tasks_with_epics_df is None or (not changeset.new.empty and new_tasks_with_epics_df.empty):
+                self.bot.send_message_async(admin_chat_id, "Proses Gagal: Backlog Converter (LLM) tidak menghasilkan data valid untuk semua task.")
+                return self._finish('llm_failed', timings)
+            # Task yang tetap gagal setelah diulang satu per satu tidak ikut ditulis; laporkan ke admin
+            classified_keys = set(task_keys(new_tasks_with_epics_df)) if not new_tasks_with_epics_df.empty else set()
+            unclassified_df = changeset.new.loc[[key not in classified_keys for key in task_keys(changeset.new)]]
+            if not unclassified_df.empty:
+                logger.warning(f"{len(unclassified_df)} task baru tidak mendapat Epic dan tidak ditulis.")
+
+            # 5. GABUNGKAN SEMUA DATA
+            with self._stage(timings, 'merge'):
+                final_df = merge_parts([done_tasks_df, changeset.completed, changeset.ongoing, new_tasks_with_epics_df])
+
+            # 6. SORTIR DAN FORMAT ULANG TANGGAL
+            with self._stage(timings, 'sort'):
+                final_df = sort_for_sheet(final_df)
+
+            # 7. ARSIPKAN TASK DONE LAMA AGAR WORKSHEET UTAMA HANYA BERISI PEKERJAAN TERBUKA
+            with self._stage(timings, 'archive'):
+                archived_count = 0
+                if self.archiver is not None:
+                    final_df, archive_df = self.archiver.split(final_df, today=datetime.now())
+                    archived_count = self.archiver.archive(archive_df, worksheet_name=self.worksheet_name)
+
+            # 8. SINKRONKAN HANYA SEL YANG BERUBAH
+            with self._stage(timings, 'write_sheet'):
+                final_df = format_dates_for_sheet(final_df)
+                sync_stats = self.sheets_client.sync_worksheet_with_df(
+                    worksheet_name=self.worksheet_name,
+                    data_df=final_df
+                )
+                # Task InProgress di sheet sekarang = task berjalan + task baru yang mendapat Epic
+                written_new_df = new_tasks_with_epics_df if not new_tasks_with_epics_df.empty else changeset.new.iloc[0:0]
+                self._task_index = task_index.apply(Changeset(changeset.completed, changeset.ongoing, written_new_df))
+                self._task_index_version = sync_stats.get('sheet_version')
+
+            feedback_message = (f"✅ Sukses! Worksheet '{self.worksheet_name}' telah di-update. Total {sync_stats['rows']} baris data "
+                                f"({len(changeset.completed)} selesai, {len(changeset.ongoing)} berjalan, {len(new_tasks_with_epics_df)} baru; "
+                                f"{sync_stats['cells_written']} sel ditulis, {sync_stats['cells_unchanged']} sel tidak berubah"
+                                + (f", {sync_stats['cells_blanked']} sel dikosongkan" if sync_stats.get('cells_blanked') else "") + ")."
+                                + (f"\n🗄️ {archived_count} task Done lama dipindahkan ke arsip." if archived_count else "")
+                                + format_unclassified_tasks(unclassified_df)
+                                + format_parse_errors(parse_errors))
+            self.bot.send_message_async(admin_chat_id, feedback_message)
+            return self._finish('success', timings)
+
+        except Exception as e:
+            logger.exception(f"Error di thread pemrosesan: {e}")
+            if admin_chat_id is not None:
+                self.bot.send_message_async(admin_chat_id, f"❌ Proses Gagal: Terjadi error.\n\nDetail: {e}")
+            return self._finish('error', timings)
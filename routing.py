@@ -0,0 +1,83 @@
+# routing.py
+import json
+import logging
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+class Route(NamedTuple):
+    """Satu tim: chat dan admin yang boleh mengirim laporan, serta worksheet tujuannya."""
+    name: str
+    spreadsheet_id: str
+    worksheet_name: str
+    admin_ids: frozenset
+    chat_ids: frozenset  # Kosong = laporan dari chat mana pun (selama pengirimnya admin route ini)
+
+    @property
+    def key(self) -> str:
+        """Key antrean job; satu worksheet diproses oleh satu worker pada satu waktu."""
+        return f"{self.spreadsheet_id}/{self.worksheet_name}"
+
+class Router:
+    """
+    Memetakan (chat, pengirim) ke Route. Route yang menyebut chat_ids dicocokkan lebih dulu,
+    baru kemudian route tanpa chat_ids (misalnya admin yang mengirim dari chat pribadi).
+    """
+    def __init__(self, routes: list[Route]):
+        if not routes:
+            raise ValueError("Minimal satu route harus dikonfigurasi.")
+        names = [route.name for route in routes]
+        keys = [route.key for route in routes]
+        if len(set(names)) != len(names):
+            raise ValueError("Nama route harus unik.")
+        if len(set(keys)) != len(keys):
+            raise ValueError("Setiap worksheet hanya boleh menjadi tujuan satu route.")
+        self.routes = list(routes)
+        self._routes_by_chat = {}
+        self._routes_any_chat = []
+        for route in self.routes:
+            if route.chat_ids:
+                for chat_id in route.chat_ids:
+                    self._routes_by_chat.setdefault(chat_id, []).append(route)
+            else:
+                self._routes_any_chat.append(route)
+        logger.info(f"Router dimuat dengan {len(self.routes)} route.")
+
+    def __len__(self):
+        return len(self.routes)
+
+    @classmethod
+    def from_single(cls, spreadsheet_id, worksheet_name, admin_id, name='default'):
+        """Satu route dari konfigurasi .env lama (GOOGLE_SHEET_ID, TARGET_WORKSHEET_NAME, ADMIN_TELEGRAM_ID)."""
+        return cls([Route(name, spreadsheet_id, worksheet_name, frozenset([str(admin_id)]), frozenset())])
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Membaca daftar route dari file JSON, misalnya:
+        [{"name": "tim-a", "spreadsheet_id": "...", "worksheet_name": "Backlog",
+          "admin_ids": [111], "chat_ids": [-100123]}]
+        """
+        with open(path, encoding='utf-8') as f:
+            entries = json.load(f)
+        routes = []
+        for entry in entries:
+            missing = [field for field in ('name', 'spreadsheet_id', 'worksheet_name', 'admin_ids') if not entry.get(field)]
+            if missing:
+                raise ValueError(f"Route {entry.get('name', '?')} di '{path}' tidak memiliki: {', '.join(missing)}.")
+            routes.append(Route(
+                name=str(entry['name']),
+                spreadsheet_id=str(entry['spreadsheet_id']),
+                worksheet_name=str(entry['worksheet_name']),
+                admin_ids=frozenset(str(admin_id) for admin_id in entry['admin_ids']),
+                chat_ids=frozenset(str(chat_id) for chat_id in entry.get('chat_ids', [])),
+            ))
+        return cls(routes)
+
+    def resolve(self, chat_id, user_id) -> Route | None:
+        """Route untuk laporan dari `user_id` di `chat_id`, atau None jika pengirim tidak berhak."""
+        chat_id, user_id = str(chat_id), str(user_id)
+        for route in self._routes_by_chat.get(chat_id, []) + self._routes_any_chat:
+            if user_id in route.admin_ids:
+                return route
+        return None
@@ -0,0 +1,166 @@
+# services.py
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class Services:
+    """
+    Client bersama (Telegram, Google Sheets, Gemini) dan pipeline per route yang dibuat saat pertama kali
+    dibutuhkan. Import library berat (pandas, gspread, google.generativeai) ikut ditunda sampai saat itu,
+    sehingga server sudah bisa menerima webhook sebelum koneksi ke Google siap. Setiap client dibuat sekali
+    dan dipakai bersama oleh semua worker dan semua route.
+    """
+    def __init__(self, config: dict):
+        self.config = config
+        self.ready = threading.Event()
+        self._instances = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _get(self, name, factory):
+        if name in self._instances:
+            return self._instances[name]
+        with self._locks_guard:
+            lock = self._locks.setdefault(name, threading.Lock())
+        # Lock per client: thread lain yang butuh client berbeda tidak ikut menunggu
+        with lock:
+            if name not in self._instances:
+                started = time.perf_counter()
+                self._instances[name] = factory()
+                logger.info(f"Client '{name}' siap dalam {time.perf_counter() - started:.2f} detik.")
+        return self._instances[name]
+
+    def peek(self, name):
+        """Mengembalikan client jika sudah dibuat, tanpa memicu pembuatannya."""
+        return self._instances.get(name)
+
+    @property
+    def bot(self):
+        return self._get('bot', self._create_bot)
+
+    @property
+    def gspread_client(self):
+        """Satu client gspread terotorisasi dipakai bersama oleh semua spreadsheet."""
+        return self._get('gspread_client', self._create_gspread_client)
+
+    @property
+    def key_pool(self):
+        return self._get('key_pool', self._create_key_pool)
+
+    def sheets_client_for(self, spreadsheet_id):
+        """GoogleSheetsClient per spreadsheet; route dengan spreadsheet yang sama berbagi handle worksheet."""
+        return self._get(f'sheets_client:{spreadsheet_id}', lambda: self._create_sheets_client(spreadsheet_id))
+
+    def pipeline_for(self, route):
+        """Pipeline per route, dengan epic cache (namespace), epic index, dan arsip milik route itu sendiri."""
+        return self._get(f'pipeline:{route.name}', lambda: self._create_pipeline(route))
+
+    def _create_bot(self):
+        from telegram_bot import TelegramBot
+        return TelegramBot(
+            token=self.config['TELEGRAM_BOT_TOKEN'],
+            api_base_url=self.config['TELEGRAM_API_URL'],
+            timeout=self.config['TELEGRAM_TIMEOUT_SECONDS']
+        )
+
+    def _create_gspread_client(self):
+        from google_sheets import authorize
+        return authorize(self.config['GOOGLE_CREDENTIALS_FILE'])
+
+    def _create_sheets_client(self, spreadsheet_id):
+        from google_sheets import GoogleSheetsClient
+        return GoogleSheetsClient(
+            credentials_file=self.config['GOOGLE_CREDENTIALS_FILE'],
+            spreadsheet_id=spreadsheet_id,
+            snapshot_max_age_seconds=self.config['SHEET_SNAPSHOT_MAX_AGE_SECONDS'],
+            client=self.gspread_client
+        )
+
+    def _create_key_pool(self):
+        from converters.llm_backend import KeyPool
+        return KeyPool.from_api_keys(
+            self.config['GEMINI_API_KEY'],
+            requests_per_minute=self.config['GEMINI_RPM_PER_KEY'],
+            tokens_per_minute=self.config['GEMINI_TPM_PER_KEY']
+        )
+
+    def _create_pipeline(self, route):
+        from epic_cache import EpicCache
+        from pipeline import BacklogPipeline
+        from converters.backlog_converter import BacklogProcessor
+        from converters.epic_index import EpicIndex
+
+        sheets_client = self.sheets_client_for(route.spreadsheet_id)
+        epic_cache = EpicCache(
+            db_path=self.config['EPIC_CACHE_PATH'],
+            max_entries=self.config['EPIC_CACHE_MAX_ENTRIES'],
+            max_age_days=self.config['EPIC_CACHE_MAX_AGE_DAYS'],
+            namespace=route.name
+        )
+        epic_index = EpicIndex(max_documents=self.config['EPIC_INDEX_MAX_DOCUMENTS'])
+        backlog_processor = BacklogProcessor(
+            key_pool=self.key_pool,
+            epic_index=epic_index,
+            candidate_top_k=self.config['EPIC_CANDIDATE_TOP_K'],
+            auto_assign_threshold=self.config['EPIC_AUTO_ASSIGN_THRESHOLD'],
+            batch_size=self.config['LLM_BATCH_SIZE'],
+            max_workers=self.config['LLM_MAX_WORKERS'],
+            epic_cache=epic_cache
+        )
+        archiver = None
+        if self.config['ARCHIVE_DONE_AFTER_DAYS'] > 0:
+            from archiver import DoneTaskArchiver
+            archiver = DoneTaskArchiver(
+                sheets_client=sheets_client,
+                archive_after_days=self.config['ARCHIVE_DONE_AFTER_DAYS'],
+                mode=self.config['ARCHIVE_MODE'],
+                parquet_dir=self.config['ARCHIVE_PARQUET_DIR']
+            )
+        return BacklogPipeline(
+            bot=self.bot,
+            sheets_client=sheets_client,
+            backlog_processor=backlog_processor,
+            worksheet_name=route.worksheet_name,
+            admin_ids=route.admin_ids,
+            bot_username=self.config['BOT_USERNAME'],
+            epic_cache=epic_cache,
+            epic_index=epic_index,
+            archiver=archiver,
+            name=route.name
+        )
+
+    def warm_up(self, routes):
+        """Membuat client bersama dan pipeline setiap route sekarang (di thread pemanggil)."""
+        self.bot
+        self.key_pool
+        failures = []
+        for route in routes:
+            try:
+                self.pipeline_for(route)
+            except Exception as e:
+                # Route lain tetap disiapkan; route yang gagal dicoba lagi pada putaran berikutnya
+                failures.append(f"{route.name}: {e}")
+        if failures:
+            raise RuntimeError("; ".join(failures))
+        self.ready.set()
+
+    def start_warm_up(self, routes, initial_retry_seconds=5, max_retry_seconds=300):
+        """
+        Menyiapkan client di thread background. Jika gagal (misalnya Google tidak bisa dihubungi),
+        dicoba lagi dengan jeda yang makin panjang; sementara itu webhook tetap menerima update.
+        """
+        def run():
+            retry_seconds = initial_retry_seconds
+            while True:
+                try:
+                    self.warm_up(routes)
+                    logger.info("Warm-up selesai. Semua client siap.")
+                    return
+                except Exception as e:
+                    logger.warning(f"Warm-up gagal: {e}. Dicoba lagi dalam {retry_seconds} detik.")
+                    time.sleep(retry_seconds)
+                    retry_seconds = min(retry_seconds * 2, max_retry_seconds)
+
+        threading.Thread(target=run, name="services-warm-up", daemon=True).start()
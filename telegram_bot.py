@@ -1,22 +1,267 @@
 # telegram_bot.py
+import asyncio
+import collections
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from metrics import REGISTRY
+
+try:
+    import httpx
+except ImportError:  # httpx hanya dibutuhkan oleh AsyncTelegramBot
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_BASE_URL = "https://api.telegram.org"
+
+def _is_connect_error(exc) -> bool:
+    """True jika request gagal saat membuka koneksi, sehingga dipastikan belum sampai ke Telegram."""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    if not isinstance(exc, requests.ConnectionError):
+        return False
+    reason = getattr(exc.args[0], 'reason', None) if exc.args else None
+    return isinstance(reason, NewConnectionError)
+
+class ChatRateLimiter:
+    """
+    Menjaga jarak minimum antar pesan per chat sesuai batas Telegram
+    (sekitar 1 pesan/detik untuk chat pribadi dan 20 pesan/menit untuk grup).
+    """
+    def __init__(self, private_interval_seconds=1.0, group_interval_seconds=3.0):
+        self.private_interval_seconds = private_interval_seconds
+        self.group_interval_seconds = group_interval_seconds
+        self._lock = threading.Lock()
+        self._next_allowed = {}
+
+    def _interval(self, chat_id):
+        # ID grup/supergrup di Telegram selalu negatif
+        return self.group_interval_seconds if str(chat_id).startswith('-') else self.private_interval_seconds
+
+    def reserve(self, chat_id) -> float:
+        """Memesan slot kirim berikutnya untuk chat ini dan mengembalikan lama menunggu (detik)."""
+        with self._lock:
+            now = time.monotonic()
+            send_at = max(now, self._next_allowed.get(chat_id, now))
+            self._next_allowed[chat_id] = send_at + self._interval(chat_id)
+            return send_at - now
+
+    def wait_time(self, chat_id) -> float:
+        """Lama menunggu (detik) sampai chat ini boleh dikirimi pesan lagi, tanpa memesan slot."""
+        with self._lock:
+            return max(0.0, self._next_allowed.get(chat_id, 0) - time.monotonic())
+
+    def block(self, chat_id, seconds):
+        """Menahan chat ini selama `seconds`, misalnya setelah Telegram membalas 429."""
+        with self._lock:
+            self._next_allowed[chat_id] = max(self._next_allowed.get(chat_id, 0), time.monotonic() + seconds)
 
 class TelegramBot:
-    def __init__(self, token):
+    def __init__(self, token, api_base_url=DEFAULT_API_BASE_URL, timeout=10, max_retries=3,
+                 backoff_seconds=1.0, pool_size=10, rate_limiter=None):
         self.token = token
-        self.api_url = f"https://api.telegram.org/bot{token}/"
+        self.api_url = f"{api_base_url.rstrip('/')}/bot{token}/"
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.rate_limiter = rate_limiter or ChatRateLimiter()
+        # Session dipakai ulang agar koneksi TCP/TLS ke Telegram tidak dibuka ulang di setiap pesan
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._send_queue = None
+        self._send_queue_lock = threading.Lock()
+
+    def _request(self, http_method, method, chat_id=None, wait_on_rate_limit=True, **kwargs):
+        """
+        Memanggil Bot API dengan timeout, retry ber-backoff, dan menghormati retry_after pada 429.
+        POST hanya diulang jika koneksi gagal dibuka: setelah timeout baca, Telegram mungkin sudah
+        memproses pesannya dan retry akan mengirim duplikat. Dengan `wait_on_rate_limit=False`,
+        respons 429 langsung dikembalikan agar pemanggil menjadwalkan ulang sendiri.
+        """
+        payload = {'ok': False, 'description': 'Tidak ada respons dari Telegram.'}
+        for attempt in range(self.max_retries + 1):
+            backoff = self.backoff_seconds * (2 ** attempt)
+            try:
+                response = self.session.request(http_method, self.api_url + method, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                REGISTRY.inc('backlog_bot_telegram_api_calls_total', method=method, status='connection_error')
+                payload = {'ok': False, 'description': f"Gagal menghubungi Telegram: {e}"}
+                logger.warning(f"Percobaan {attempt + 1} '{method}' gagal: {e}")
+                if http_method == "POST" and not _is_connect_error(e):
+                    return payload
+                if attempt < self.max_retries:
+                    time.sleep(backoff)
+                continue
+            REGISTRY.inc('backlog_bot_telegram_api_calls_total', method=method, status=response.status_code)
+
+            try:
+                payload = response.json()
+            except ValueError:
+                payload = {'ok': False, 'description': response.text}
+
+            if response.status_code == 429:
+                retry_after = payload.get('parameters', {}).get('retry_after', backoff)
+                logger.warning(f"Telegram membatasi '{method}' (429). Menunggu {retry_after} detik...")
+                if chat_id is not None:
+                    self.rate_limiter.block(chat_id, retry_after)
+                if not wait_on_rate_limit:
+                    return payload
+                if attempt < self.max_retries:
+                    time.sleep(retry_after)
+                continue
+            if response.status_code >= 500:
+                logger.warning(f"Telegram error {response.status_code} pada '{method}'. Mencoba lagi...")
+                if attempt < self.max_retries:
+                    time.sleep(backoff)
+                continue
+            return payload
+        return payload
 
     def set_webhook(self, url):
         method = "setWebhook"
         params = {"url": url}
-        response = requests.get(self.api_url + method, params)
-        if response.json().get('ok'):
-            print("Webhook berhasil diatur.")
+        result = self._request("GET", method, params=params)
+        if result.get('ok'):
+            logger.info("Webhook berhasil diatur.")
         else:
-            print(f"Gagal mengatur webhook: {response.json()}")
+            logger.warning(f"Gagal mengatur webhook: {result}")
 
     def send_message(self, chat_id, text):
         method = "sendMessage"
         params = {"chat_id": chat_id, "text": text}
-        response = requests.post(self.api_url + method, data=params)
-        return response.json()
\ No newline at end of file
+        wait_seconds = self.rate_limiter.reserve(chat_id)
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+        return self._request("POST", method, chat_id=chat_id, data=params)
+
+    def send_message_async(self, chat_id, text):
+        """Memasukkan pesan ke antrean kirim di background agar pemanggil tidak menunggu Telegram."""
+        with self._send_queue_lock:
+            if self._send_queue is None:
+                self._send_queue = queue.Queue()
+                threading.Thread(target=self._sender_loop, name="telegram-sender", daemon=True).start()
+        self._send_queue.put((chat_id, text))
+
+    def _sender_loop(self):
+        """
+        Mengirim antrean dengan jadwal per chat. Chat yang sedang ditahan (jeda antar pesan atau
+        retry_after dari 429) dijadwalkan ulang, bukan ditunggu dengan sleep, sehingga chat tim lain
+        tetap terkirim. Urutan pesan dalam satu chat tetap terjaga.
+        """
+        pending = {}   # chat_id -> deque [teks, jumlah 429] yang menunggu giliran
+        schedule = []  # heap (waktu siap, urutan, chat_id), satu entri per chat yang punya pesan
+        order = itertools.count()
+        while True:
+            timeout = max(0.0, schedule[0][0] - time.monotonic()) if schedule else None
+            try:
+                chat_id, text = self._send_queue.get(timeout=timeout)
+            except queue.Empty:
+                pass
+            else:
+                if chat_id not in pending:
+                    pending[chat_id] = collections.deque()
+                    ready_at = time.monotonic() + self.rate_limiter.wait_time(chat_id)
+                    heapq.heappush(schedule, (ready_at, next(order), chat_id))
+                pending[chat_id].append([text, 0])
+                continue
+
+            # get() habis waktu, jadi chat terdepan di jadwal sudah boleh dikirimi
+            _, _, chat_id = heapq.heappop(schedule)
+            messages = pending[chat_id]
+            message = messages[0]
+            rate_limited = False
+            try:
+                wait_seconds = self.rate_limiter.reserve(chat_id)
+                if wait_seconds > 0:  # slot sempat diambil send_message() dari thread lain
+                    time.sleep(wait_seconds)
+                result = self._request("POST", "sendMessage", chat_id=chat_id, wait_on_rate_limit=False,
+                                       data={"chat_id": chat_id, "text": message[0]})
+                rate_limited = result.get('error_code') == 429
+                if not result.get('ok') and not rate_limited:
+                    logger.warning(f"Gagal mengirim pesan ke {chat_id}: {result}")
+            except Exception as e:
+                logger.error(f"Error saat mengirim pesan ke {chat_id}: {e}")
+
+            if rate_limited and message[1] < self.max_retries:
+                message[1] += 1
+            else:
+                if rate_limited:
+                    logger.warning(f"Gagal mengirim pesan ke {chat_id}: dibatasi Telegram {message[1] + 1} kali.")
+                messages.popleft()
+            if messages:
+                ready_at = time.monotonic() + self.rate_limiter.wait_time(chat_id)
+                heapq.heappush(schedule, (ready_at, next(order), chat_id))
+            else:
+                del pending[chat_id]
+
+class AsyncTelegramBot:
+    """Varian asyncio dari TelegramBot berbasis httpx (opsional: pip install httpx)."""
+    def __init__(self, token, api_base_url=DEFAULT_API_BASE_URL, timeout=10, max_retries=3,
+                 backoff_seconds=1.0, pool_size=10, rate_limiter=None):
+        if httpx is None:
+            raise ImportError("AsyncTelegramBot membutuhkan library 'httpx'. Jalankan: pip install httpx")
+        self.api_url = f"{api_base_url.rstrip('/')}/bot{token}/"
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.rate_limiter = rate_limiter or ChatRateLimiter()
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+
+    async def _request(self, http_method, method, chat_id=None, **kwargs):
+        payload = {'ok': False, 'description': 'Tidak ada respons dari Telegram.'}
+        for attempt in range(self.max_retries + 1):
+            backoff = self.backoff_seconds * (2 ** attempt)
+            try:
+                response = await self.client.request(http_method, self.api_url + method, **kwargs)
+            except httpx.TransportError as e:
+                REGISTRY.inc('backlog_bot_telegram_api_calls_total', method=method, status='connection_error')
+                payload = {'ok': False, 'description': f"Gagal menghubungi Telegram: {e}"}
+                # POST hanya diulang jika koneksi gagal dibuka (lihat TelegramBot._request)
+                if http_method == "POST" and not isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout)):
+                    return payload
+                if attempt < self.max_retries:
+                    await asyncio.sleep(backoff)
+                continue
+            REGISTRY.inc('backlog_bot_telegram_api_calls_total', method=method, status=response.status_code)
+
+            try:
+                payload = response.json()
+            except ValueError:
+                payload = {'ok': False, 'description': response.text}
+
+            if response.status_code == 429:
+                retry_after = payload.get('parameters', {}).get('retry_after', backoff)
+                if chat_id is not None:
+                    self.rate_limiter.block(chat_id, retry_after)
+                if attempt < self.max_retries:
+                    await asyncio.sleep(retry_after)
+                continue
+            if response.status_code >= 500:
+                if attempt < self.max_retries:
+                    await asyncio.sleep(backoff)
+                continue
+            return payload
+        return payload
+
+    async def set_webhook(self, url):
+        return await self._request("GET", "setWebhook", params={"url": url})
+
+    async def send_message(self, chat_id, text):
+        wait_seconds = self.rate_limiter.reserve(chat_id)
+        if wait_seconds > 0:
+            await asyncio.sleep(wait_seconds)
+        return await self._request("POST", "sendMessage", chat_id=chat_id, data={"chat_id": chat_id, "text": text})
+
+    async def aclose(self):
+        await self.client.aclose()
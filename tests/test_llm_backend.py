@@ -0,0 +1,69 @@
+# tests/test_llm_backend.py
+"""
+Uji offline KeyPool dengan FakeLLMBackend: failover ke key sehat, circuit breaker terbuka, dan pemulihan
+lewat request percobaan (setengah terbuka). Jalankan dari root proyek:
+
+    python -m pytest -q tests
+    python -m unittest discover tests
+"""
+import time
+import unittest
+
+from converters.llm_backend import FakeLLMBackend, KeyPool, LLMError
+
+PROMPT = "--- BACKLOG BARU ---\n1\tBudi\tperbaikan login\n--- AKHIR BACKLOG BARU ---\nNo|Epic"
+
+def make_pool(*backends, failure_threshold=2, cooldown_seconds=0.05):
+    return KeyPool(list(backends), requests_per_minute=10**6, tokens_per_minute=10**9,
+                   failure_threshold=failure_threshold, cooldown_seconds=cooldown_seconds)
+
+class KeyPoolTest(unittest.TestCase):
+    def test_failover_avoids_failing_key(self):
+        broken = FakeLLMBackend('rusak', failure_rate=1.0)
+        healthy = FakeLLMBackend('sehat')
+        pool = make_pool(broken, healthy, failure_threshold=3)
+
+        for _ in range(5):
+            self.assertEqual(pool.generate(PROMPT), "1|Epic Perbaikan")
+        # Setelah gagal sekali, key rusak kalah skor dari key sehat dan tidak dipilih lebih dulu lagi
+        self.assertEqual(broken.calls, 1)
+        self.assertEqual(healthy.calls, 5)
+
+    def test_circuit_opens_after_consecutive_failures(self):
+        broken = FakeLLMBackend('rusak', failure_rate=1.0)
+        pool = make_pool(broken, cooldown_seconds=60)
+
+        for _ in range(2):
+            with self.assertRaises(LLMError):
+                pool.generate(PROMPT)
+        with self.assertRaisesRegex(LLMError, "circuit breaker"):
+            pool.generate(PROMPT)
+        self.assertEqual(broken.calls, 2)
+        self.assertTrue(pool.get_stats()[0]['circuit_open'])
+
+    def test_half_open_sends_one_probe_then_recovers(self):
+        flaky = FakeLLMBackend('flaky', failure_rate=1.0)
+        healthy = FakeLLMBackend('sehat')
+        pool = make_pool(flaky, healthy)
+        # Buka circuit key flaky langsung, tanpa bergantung pada urutan pemilihan key
+        for _ in range(2):
+            pool._record_failure(pool._keys[0], LLMError("error palsu"), 0.0)
+        self.assertTrue(pool.get_stats()[0]['circuit_open'])
+
+        # Cooldown habis, key masih rusak: satu percobaan gagal, request dialihkan, circuit dibuka lagi
+        time.sleep(0.06)
+        self.assertEqual(pool.generate(PROMPT), "1|Epic Perbaikan")
+        self.assertEqual(flaky.calls, 1)
+        self.assertTrue(pool.get_stats()[0]['circuit_open'])
+
+        # Cooldown (kini dua kali lipat) habis dan key sudah pulih: percobaan berhasil, circuit tertutup
+        flaky.failure_rate = 0.0
+        time.sleep(0.11)
+        self.assertEqual(pool.generate(PROMPT), "1|Epic Perbaikan")
+        self.assertEqual(flaky.calls, 2)
+        stats = pool.get_stats()[0]
+        self.assertFalse(stats['circuit_open'])
+        self.assertEqual(pool._keys[0]['consecutive_failures'], 0)
+
+if __name__ == '__main__':
+    unittest.main()